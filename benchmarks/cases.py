@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Benchmark cases, each one run in a fresh interpreter by run.py
+
+Usage: cases.py CASE [scripthelper arguments]
+
+Prints the measured durations as a JSON object, in seconds per operation."""
+
+import contextlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+CASES = {}
+
+
+def case(func):
+    CASES[func.__name__] = func
+    return func
+
+
+def per_call(func, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number
+
+
+@contextlib.contextmanager
+def null_output():
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            yield devnull
+
+
+@case
+def import_time():
+    start = time.perf_counter()
+    import scripthelper  # noqa: F401
+
+    return {"import": time.perf_counter() - start}
+
+
+@case
+def bootstrap():
+    import scripthelper
+
+    start = time.perf_counter()
+    scripthelper.bootstrap()
+    return {"bootstrap": time.perf_counter() - start}
+
+
+@case
+def log():
+    import scripthelper
+
+    scripthelper.add_argument("--file-logging", action="store_true")
+    logger, args = scripthelper.bootstrap_args()
+    directory = tempfile.mkdtemp()
+    try:
+        if args.file_logging:
+            scripthelper.setup_file_logging(
+                filename=os.path.join(directory, "bench.log")
+            )
+        with null_output():
+            results = {
+                "debug": per_call(lambda: logger.debug("Record #%d", 1), 200_000),
+                "info": per_call(lambda: logger.info("Record #%d", 1), 20_000),
+                "warning": per_call(lambda: logger.warning("Record #%d", 1), 20_000),
+            }
+    finally:
+        logging.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+@case
+def console_write():
+    import scripthelper
+    from console_throughput import measure
+
+    logger = scripthelper.bootstrap()
+    handler = next(
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, scripthelper.ConsoleLogHandler)
+    )
+    records = 20_000
+    with null_output():
+        handler._stdout_is_tty = True  # Measure as if stdout was a terminal
+        direct = measure(handler, logger, records)
+        with scripthelper.progressbar(total=1, disable=False, file=sys.stderr):
+            tqdm_write = measure(handler, logger, records)
+    return {"direct": 1 / direct, "tqdm.write": 1 / tqdm_write}
+
+
+@case
+def get_logger():
+    import scripthelper
+
+    scripthelper.bootstrap()
+    return {
+        "caller": per_call(scripthelper.getLogger, 100_000),
+        "named": per_call(lambda: scripthelper.getLogger("bench"), 100_000),
+    }
+
+
+@case
+def progressbar():
+    import scripthelper
+    from progress_overhead import measure
+
+    scripthelper.bootstrap()
+    iterations = 1_000_000
+    with open(os.devnull, "w") as devnull:
+        results = {
+            "plain_loop": measure(range(iterations)),
+            "disabled": measure(
+                scripthelper.progressbar(range(iterations), disable=True)
+            ),
+            "enabled": measure(
+                scripthelper.progressbar(range(iterations), disable=False, file=devnull)
+            ),
+            "counter.disabled": measure(
+                scripthelper.progress_counter(range(iterations), disable=True)
+            ),
+            "counter.enabled": measure(
+                scripthelper.progress_counter(
+                    range(iterations), disable=False, file=devnull
+                )
+            ),
+        }
+    return {name: seconds / iterations for name, seconds in results.items()}
+
+
+@case
+def pprint():
+    import scripthelper
+
+    scripthelper.bootstrap()
+    data = {
+        f"key{i}": {
+            "list": list(range(20)),
+            "nested": {"name": f"item {i}", "value": i * 1.5, "flags": [True, None]},
+        }
+        for i in range(300)
+    }
+    with null_output():
+        scripthelper.pprint(data)  # Warm up the lazy prettyprinter setup
+        return {"nested": per_call(lambda: scripthelper.pprint(data), 5)}
+
+
+@case
+def persisted_state():
+    import scripthelper
+
+    scripthelper.bootstrap()
+    directory = tempfile.mkdtemp()
+    results = {}
+    variants = {
+        "yaml_journal": ("bench.state", {}),
+        "yaml": ("bench.yaml", {"_flush_interval": 3600}),
+        "json": ("bench.json", {"_flush_interval": 3600}),
+        "sqlite": ("bench.sqlite", {"_flush_interval": 3600}),
+    }
+    try:
+        for name, (filename, options) in variants.items():
+            state = scripthelper.PersistedState(
+                os.path.join(directory, filename), entries={}, **options
+            )
+            entries = state.entries
+            for i in range(10_000):
+                entries[str(i)] = i
+            state.flush()
+
+            keys = (str(i % 10_000) for i in itertools.count())
+            results[f"{name}.mutation"] = per_call(
+                lambda: entries.__setitem__(next(keys), -1), 2_000
+            )
+            if name != "yaml_journal":  # flush() is a no-op there
+                flushes = []
+                for _ in range(5):
+                    for _ in range(100):
+                        entries[next(keys)] = -1
+                    start = time.perf_counter()
+                    state.flush()
+                    flushes.append(time.perf_counter() - start)
+                results[f"{name}.flush"] = sum(flushes) / len(flushes)
+            state.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def main():
+    name = sys.argv.pop(1)
+    stdout = sys.stdout
+    results = CASES[name]()
+    print(json.dumps(results), file=stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Console log throughput: direct stream writing vs. tqdm.write()
+
+Both stdout and stderr are redirected to the null device during the measurement.
+The tqdm.write() path is forced by a running (enabled) progressbar on a terminal."""
+
+import contextlib
+import logging
+import os
+import sys
+import time
+
+import scripthelper
+
+RECORDS = 20_000
+
+
+def measure(handler, logger, records):
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info("Record #%d", i)
+    handler.flush()
+    return records / (time.perf_counter() - start)
+
+
+def main():
+    scripthelper.add_argument("--records", type=int, default=RECORDS)
+    logger, args = scripthelper.bootstrap_args()
+    handler = next(
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, scripthelper.ConsoleLogHandler)
+    )
+
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            handler._stdout_is_tty = True  # Measure as if stdout was a terminal
+            results["direct"] = measure(handler, logger, args.records)
+            with scripthelper.progressbar(total=1, disable=False, file=sys.stderr):
+                results["tqdm.write"] = measure(handler, logger, args.records)
+
+    for mode, records_per_second in results.items():
+        logger.info(f"{mode:>10}: {records_per_second:10,.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
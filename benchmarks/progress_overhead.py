@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Per-iteration overhead of progressbar() and progress_counter() against a plain loop
+
+The enabled progressbars are written to the null device."""
+
+import os
+import time
+
+import scripthelper
+
+ITERATIONS = 5_000_000
+
+
+def measure(iterable):
+    start = time.perf_counter()
+    for _ in iterable:
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    scripthelper.add_argument("--iterations", type=int, default=ITERATIONS)
+    logger, args = scripthelper.bootstrap_args()
+    iterations = args.iterations
+
+    with open(os.devnull, "w") as devnull:
+        results = {
+            "plain loop": measure(range(iterations)),
+            "progressbar (disabled)": measure(
+                scripthelper.progressbar(range(iterations), disable=True)
+            ),
+            "progress_counter (disabled)": measure(
+                scripthelper.progress_counter(range(iterations), disable=True)
+            ),
+            "progressbar (enabled)": measure(
+                scripthelper.progressbar(range(iterations), disable=False, file=devnull)
+            ),
+            "progress_counter (enabled)": measure(
+                scripthelper.progress_counter(
+                    range(iterations), disable=False, file=devnull
+                )
+            ),
+        }
+
+    baseline = results["plain loop"]
+    for name, seconds in results.items():
+        overhead_ns = (seconds - baseline) / iterations * 1e9
+        logger.info(f"{name:>28}: {overhead_ns:6.1f} ns/iteration overhead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Benchmark suite with machine-readable results and regression checking
+
+Every benchmark runs in a fresh interpreter (see cases.py) several times,
+the median is reported in seconds per operation (lower is better).
+
+    just bench --output baseline.json
+    just bench --compare baseline.json
+    just bench --input current.json --compare baseline.json --threshold 0.1
+
+Comparing exits with status 1 if any benchmark got slower than the threshold."""
+
+import importlib.metadata
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import scripthelper
+
+CASES = Path(__file__).with_name("cases.py")
+
+# Benchmark name prefix, case name and scripthelper arguments of the case
+BENCHMARKS = [
+    ("import", "import_time", []),
+    ("bootstrap", "bootstrap", []),
+    ("log.no_colors", "log", ["--no-colors"]),
+    ("log.no_colors.file", "log", ["--no-colors", "--file-logging"]),
+    ("log.colors", "log", ["--colors"]),
+    ("log.colors.file", "log", ["--colors", "--file-logging"]),
+    ("console_write", "console_write", []),
+    ("get_logger", "get_logger", []),
+    ("progressbar", "progressbar", []),
+    ("pprint.no_colors", "pprint", ["--no-colors"]),
+    ("pprint.colors", "pprint", ["--colors"]),
+    ("persisted_state", "persisted_state", []),
+]
+
+scripthelper.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+scripthelper.add_argument("--filter", help="run only benchmarks containing this")
+scripthelper.add_argument("--output", type=Path, help="write the results as JSON")
+scripthelper.add_argument("--input", type=Path, help="use saved results, don't run")
+scripthelper.add_argument("--compare", type=Path, help="baseline results to compare")
+scripthelper.add_argument(
+    "--threshold", type=float, default=0.25, help="allowed slowdown ratio (0.25)"
+)
+
+
+def run_case(case, arguments):
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    process = subprocess.run(
+        [sys.executable, str(CASES), case, *arguments],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if process.returncode:
+        raise RuntimeError(f"Benchmark case {case} failed:\n{process.stderr}")
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def run_benchmarks(benchmarks, repeat):
+    runs = {}
+    for _ in scripthelper.progressbar(range(repeat), desc="Rounds"):
+        for prefix, case, arguments in benchmarks:
+            for name, seconds in run_case(case, arguments).items():
+                key = prefix if name == prefix else f"{prefix}.{name}"
+                runs.setdefault(key, []).append(seconds)
+    return {
+        name: {"median": statistics.median(values), "runs": values}
+        for name, values in runs.items()
+    }
+
+
+def environment():
+    try:
+        version = importlib.metadata.version("scripthelper")
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "scripthelper": version,
+    }
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def compare(results, baseline, threshold, logger):
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["median"], result["median"]
+        ratio = after / before
+        line = (
+            f"{name:<42} {format_seconds(before):>10} -> {format_seconds(after):>10}"
+            f" {ratio:6.2f}x"
+        )
+        if ratio > 1 + threshold:
+            regressions += 1
+            logger.error(f"{line} regression")
+        elif ratio < 1 / (1 + threshold):
+            logger.info(f"{line} improvement")
+        else:
+            logger.info(line)
+    return regressions
+
+
+def main():
+    logger, args = scripthelper.bootstrap_args()
+
+    if args.input:
+        report = json.loads(args.input.read_text())
+    else:
+        benchmarks = [
+            benchmark
+            for benchmark in BENCHMARKS
+            if not args.filter or args.filter in benchmark[0]
+        ]
+        report = {
+            "environment": environment(),
+            "repeat": args.repeat,
+            "results": run_benchmarks(benchmarks, args.repeat),
+        }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        logger.info(f"Results written to {args.output}")
+
+    if not args.compare:
+        for name, result in report["results"].items():
+            logger.info(f"{name:<42} {format_seconds(result['median']):>10}")
+        return
+
+    baseline = json.loads(args.compare.read_text())
+    if baseline["environment"] != report["environment"]:
+        logger.warning(f"Baseline environment differs: {baseline['environment']}")
+    regressions = compare(
+        report["results"], baseline["results"], args.threshold, logger
+    )
+    if regressions:
+        logger.error(
+            f"{regressions} benchmark(s) regressed more than {args.threshold:.0%}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+import scripthelper
+
+logger = scripthelper.bootstrap(async_logging=True)
+scripthelper.setup_file_logging()
+
+for i in range(3):
+    logger.info(f"Message #{i} is written by a background thread")
+raise RuntimeError("The queued messages are flushed before this one.")
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+import scripthelper
+
+logger = scripthelper.bootstrap(batched_console=True)
+
+for i in scripthelper.progressbar(range(250)):
+    logger.debug(f"Iteration {i}")
+    if i % 100 == 99:
+        logger.warning(f"Iteration {i} flushes the collected messages")
+logger.info("Done")
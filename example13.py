@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+import scripthelper
+import time
+
+scripthelper.bootstrap(traceback_time_budget=0.5)
+
+
+class SlowRepr:
+    def __repr__(self):
+        time.sleep(0.2)
+        return "SlowRepr()"
+
+
+def process(depth, slow_object):
+    if depth == 0:
+        first, second, third = SlowRepr(), SlowRepr(), SlowRepr()
+        raise RuntimeError("The traceback is rendered within the time budget.")
+    process(depth - 1, slow_object)
+
+
+huge_list = list(range(10_000_000))
+process(3, SlowRepr())
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+import scripthelper
+
+scripthelper.add_argument("--log-to-file", action="store_true")
+logger, args = scripthelper.bootstrap_args(traceback_max_repeats=2)
+if args.log_to_file:
+    scripthelper.setup_file_logging()
+
+for item in range(5):
+    try:
+        raise ValueError(f"Item #{item} is invalid")
+    except ValueError:
+        logger.exception(f"Processing item #{item} failed")
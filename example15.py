@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+import example15module
+import scripthelper
+
+logger = scripthelper.bootstrap()
+
+for item in range(1, 251):
+    scripthelper.log_every_n(scripthelper.INFO, "Processing item #%d", 100, item)
+    scripthelper.log_at_most_every(
+        scripthelper.VERBOSE, "Cache miss for item %d", 60, item
+    )
+    if item % 7 == 0:
+        scripthelper.log_rate_limited(
+            scripthelper.WARNING, "Item %d has errors", 1, item, burst=2
+        )
+
+# The same message is counted separately per module
+for _ in range(3):
+    scripthelper.log_every_n(scripthelper.INFO, "Tick", 100)
+example15module.tick(3)
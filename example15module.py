@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+import scripthelper
+
+
+def tick(count):
+    for _ in range(count):
+        scripthelper.log_every_n(scripthelper.INFO, "Tick", 100)
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+import scripthelper
+
+logger = scripthelper.bootstrap(flight_recorder=3)
+
+for item in range(1, 6):
+    logger.debug(f"Processing item #{item}")
+    logger.spam("Details are recorded, too")
+logger.info("Item #5 processed")
+raise RuntimeError("The last log records are displayed before this.")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import scripthelper
+
+logger = scripthelper.getLogger()
+
+
+def process(item):
+    logger.verbose(f"Processing item #{item} in a child process")
+    if item == 3:
+        try:
+            raise ValueError(f"Item #{item} is invalid")
+        except ValueError:
+            logger.exception(f"Item #{item} failed")
+    return item * item
+
+
+def main():
+    scripthelper.add_argument("--log-to-file", action="store_true")
+    _, args = scripthelper.bootstrap_args()
+    if args.log_to_file:
+        scripthelper.setup_file_logging()
+    mp_context = multiprocessing.get_context("spawn")
+    process_logging = scripthelper.start_process_logging(mp_context)
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=mp_context,
+        initializer=scripthelper.setup_process_logging,
+        initargs=(process_logging,),
+    ) as executor:
+        results = list(executor.map(process, range(1, 5)))
+    logger.info(f"Results: {results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+import scripthelper
+import time
+
+logger = scripthelper.getLogger()
+
+
+def square(number):
+    time.sleep(0.01)
+    if number == 13:
+        raise ValueError("Unlucky number")
+    return number * number
+
+
+def main():
+    scripthelper.bootstrap()
+    squares = scripthelper.parallel_map(
+        square, range(100), workers=4, chunksize=5, skip_errors=True, desc="Squares"
+    )
+    logger.info(f"Sum of squares: {sum(squares)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+import scripthelper
+import time
+
+logger = scripthelper.bootstrap(progressbar_log_interval=0.1)
+scripthelper.setup_file_logging()
+
+for i in scripthelper.progressbar(range(20), desc="Processing"):
+    time.sleep(0.02)
+logger.info("Done")
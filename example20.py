@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+import asyncio
+import scripthelper
+
+logger = scripthelper.getLogger()
+
+
+async def fetch(item):
+    await asyncio.sleep(0.01 * (item % 3))
+    logger.verbose(f"Item #{item} is fetched")
+    return item * 10
+
+
+async def fail():
+    raise RuntimeError("This task exception is logged, too.")
+
+
+async def main():
+    results = await scripthelper.gather(*(fetch(i) for i in range(10)), limit=3)
+    logger.info(f"Results: {results}")
+
+    total = 0
+    async for result in scripthelper.as_completed(
+        (fetch(i) for i in range(1000)), limit=50, desc="Fetching"
+    ):
+        total += result
+    logger.info(f"Total: {total}")
+
+    task = asyncio.create_task(fail())
+    await asyncio.sleep(0.01)
+    del task
+
+
+scripthelper.bootstrap()
+scripthelper.run(main())
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import os
+
+import scripthelper
+
+scripthelper.add_argument("--crash", action="store_true")
+scripthelper.add_argument("--state-file")
+scripthelper.add_argument("--iterations", type=int, default=10_000)
+scripthelper.add_argument("--flush-every", type=int)
+scripthelper.add_argument("--exit-without-flush", action="store_true")
+logger, args = scripthelper.bootstrap_args()
+state = scripthelper.PersistedState(
+    args.state_file,
+    _flush_interval=5,
+    _flush_every=args.flush_every,
+    counter=0,
+    last_ids=[],
+)
+
+logger.info(f"Starting from {state.counter}")
+for _ in range(args.iterations):
+    state.counter += 1
+    state.last_ids.append(state.counter)
+    if len(state.last_ids) > 3:
+        state.last_ids.pop(0)
+if args.crash:
+    raise RuntimeError("The state is written before this is logged.")
+if args.exit_without_flush:
+    os._exit(0)  # Only the changes written by _flush_every are kept
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+import scripthelper
+
+logger = scripthelper.bootstrap()
+# Small state: JSON, the whole file is written on every change
+runs = scripthelper.PersistedState("example22.json", count=0)
+# Large state: SQLite, only the changed items are written, in batches
+seen = scripthelper.PersistedState(_backend="sqlite", _flush_every=1000, ids={})
+
+runs.count += 1
+start = (runs.count - 1) * 5000
+new_ids = 0
+for item_id in range(start, start + 10_000):
+    if str(item_id) in seen.ids:
+        continue
+    seen.ids[str(item_id)] = True
+    new_ids += 1
+logger.info(f"Run #{runs.count}: {new_ids} new IDs, {len(seen.ids)} IDs seen")
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+import scripthelper
+
+scripthelper.add_argument("--crash-at", type=int)
+logger, args = scripthelper.bootstrap_args()
+state = scripthelper.PersistedState("example23.json")
+
+items = range(1, 11)
+for item in scripthelper.resumable(items, key="items", state=state, checkpoint_every=3):
+    if item == args.crash_at:
+        raise RuntimeError(f"Cannot process item #{item}")
+    logger.info(f"Processed item #{item}")
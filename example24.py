@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import subprocess
+import sys
+
+import scripthelper
+
+scripthelper.add_argument("--worker", type=int, help="Run as the worker with this ID")
+scripthelper.add_argument(
+    "--shared-file", default="example24.json", help="The shared state (.json, .db...)"
+)
+logger, args = scripthelper.bootstrap_args()
+
+if args.worker is not None:
+    # Shared by the workers: read-modify-write under the cross-process lock
+    shared = scripthelper.PersistedState(
+        args.shared_file, _lock=True, counter=0, ids=[]
+    )
+    # One file per worker (example24.<worker>.state), without concurrent writes
+    shard = scripthelper.PersistedState(_shard=args.worker, processed=[])
+    for item in range(args.worker, 100, 4):
+        shard.processed.append(item)
+        # Merged into the current content of the file when it is written
+        shared.ids.append(item)
+        with shared.locked():
+            shared.counter += 1
+    sys.exit()
+
+workers = [
+    subprocess.Popen(
+        [
+            sys.executable,
+            __file__,
+            "--worker",
+            str(worker),
+            "--shared-file",
+            args.shared_file,
+        ]
+    )
+    for worker in range(4)
+]
+for worker in workers:
+    worker.wait()
+shared = scripthelper.PersistedState(args.shared_file, _lock=True)
+merged = scripthelper.merged_state()
+logger.info(
+    f"Counter: {shared.counter}, ids: {len(shared.ids)},"
+    f" processed: {len(merged['processed'])} items"
+)
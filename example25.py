@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+import time
+
+import scripthelper
+
+logger = scripthelper.bootstrap()
+
+
+@logger.timed("process")
+def process(item):
+    time.sleep(0.01 * (item % 3))
+
+
+for item in range(10):
+    process(item)
+with logger.timed("summary"):
+    time.sleep(0.05)
+logger.info("Done")
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+import time
+
+import scripthelper
+
+logger = scripthelper.bootstrap()
+
+
+def busy_wait(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+logger.info("Working, send SIGUSR1 for the sampled stacks")
+for _ in range(20):
+    busy_wait(0.1)
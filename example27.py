@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+import scripthelper
+
+logger = scripthelper.bootstrap(log_stats=True)
+scripthelper.setup_file_logging(level="DEBUG")
+
+for item in range(1000):
+    logger.debug(f"Processing item #{item}")
+    logger.spam("Details of the item")
+    if item % 250 == 0:
+        logger.info(f"Item #{item} processed")
+
+stats = scripthelper.log_stats()
+assert stats is not None  # Enabled with log_stats=True
+logger.info(f"Records of the file handler: {stats['handlers']['file']['records']}")
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+import scripthelper
+
+logger = scripthelper.bootstrap(progressbar_log_interval=1)
+
+chunks = []
+for _ in scripthelper.progressbar(range(100), desc="Allocating"):
+    chunks.append("x" * 100_000)
+logger.info(f"{len(chunks)} chunks are allocated")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import io
+import time
+
+import scripthelper
+
+logger = scripthelper.bootstrap(progressbar_log_interval=60)
+
+# The progress is logged on non-tty
+total = sum(scripthelper.progress_counter(range(1_000_000), desc="Summing"))
+logger.info(f"Sum: {total}")
+
+# The progressbar is written to a buffer here, to show its final state
+output = io.StringIO()
+items = scripthelper.progress_counter(
+    range(1_000_000),
+    desc="Counting",
+    disable=False,
+    file=output,
+    bar_format="{desc}: {n}/{total}",
+)
+count = sum(1 for _ in items)
+final_state = output.getvalue().split("\r")[-1]
+closed = final_state.endswith("\n")  # Written by close()
+logger.info(f"Count: {count}, final state: {final_state.strip()}, closed: {closed}")
+
+
+# The progressbar keeps being updated when the items get slower
+def fast_then_slow():
+    yield from range(1_000_000)
+    for i in range(200):
+        time.sleep(0.002)
+        yield i
+
+
+output = io.StringIO()
+items = scripthelper.progress_counter(
+    fast_then_slow(),
+    disable=False,
+    file=output,
+    bar_format="{n}",
+    mininterval=0,
+    miniters=1,
+)
+for count, _ in enumerate(items, 1):
+    if count == 1_000_200:
+        shown = int(output.getvalue().split("\r")[-1])
+        logger.info(f"Slow items shown before the end: {shown > 1_000_000}")
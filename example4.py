@@ -2,5 +2,9 @@
 import scripthelper
 import example4module
 
-scripthelper.bootstrap()
+scripthelper.add_argument("--log-to-file", action="store_true")
+logger, args = scripthelper.bootstrap_args()
+if args.log_to_file:
+    scripthelper.setup_file_logging(level="DEBUG")
+logger.debug("This is displayed only with -vv, or written to the log file.")
 example4module.do_the_things()
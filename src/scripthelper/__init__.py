@@ -7,23 +7,68 @@ The output will be colored with support of multiple
 log levels, easy-to-add command line arguments, etc."""
 
 import argparse
-import inspect
+import atexit
+import concurrent.futures
+import contextlib
+import copy
+import errno
+import functools
+import itertools
 import logging
 import logging.handlers
+import math
+import os
 import pathlib
+import queue
+import signal
 import sys
+import threading
+import time
+import traceback
 import warnings
-from typing import Optional, Tuple
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
-import coloredlogs
-import persistedstate
-import prettyprinter
-import stackprinter
-import tqdm
-from colorful import colorful  # type: ignore
+# The optional backends (coloredlogs, prettyprinter, stackprinter, tqdm, colorful,
+# persistedstate) are imported on first use, so `import scripthelper` stays cheap.
 
 _with_colors = None
 _with_traceback_variables = True
+_traceback_max_value_length = 500
+_traceback_max_frames = 100
+_traceback_time_budget = 10.0
+_traceback_max_repeats: Optional[int] = 3
+_TRACEBACK_REPEATS: Dict[Tuple, int] = {}  # (type, locations) -> occurrences
+_prettyprinter_extras_installed = False
+_log_queue_listener: Optional[logging.handlers.QueueListener] = None
+_console_log_handler: Optional[logging.Handler] = None
+_file_log_handler: Optional[logging.Handler] = None
+_flight_recorder: Optional["_FlightRecorderHandler"] = None
+_log_stats: Optional["_LogStats"] = None  # Enabled by --log-stats or bootstrap()
+_log_stats_at_exit = False
+_logger_levels: List[Tuple[str, int]] = []  # Set by --log-level
+_process_logging: Optional["ProcessLogging"] = None  # Used by parallel_map()
+_progressbar_log_interval: Optional[float] = None
+_trace_memory = False  # Set by --trace-memory
+_state_files: "weakref.WeakSet" = weakref.WeakSet()  # Coalescing PersistedState files
+_progressbars: "weakref.WeakSet" = weakref.WeakSet()  # Created by progressbar()
+_resumables: "weakref.WeakSet" = weakref.WeakSet()  # Created by resumable()
 
 __all__ = [
     # Logging
@@ -36,6 +81,10 @@ __all__ = [
     "DEBUG",
     "SPAM",
     "warning_once",
+    "log_every_n",
+    "log_at_most_every",
+    "log_rate_limited",
+    "log_stats",
     # Warning
     "warn",
     # Argument parsing and bootstrap
@@ -44,10 +93,23 @@ __all__ = [
     "initialize",
     "add_arguments",
     "setup_file_logging",
+    # Multiprocessing
+    "start_process_logging",
+    "setup_process_logging",
     "args",
     "parser",
     # Progressbar
     "progressbar",
+    "progress_counter",
+    "parallel_map",
+    # Persisted state
+    "resumable",
+    "merged_state",
+    # Asyncio
+    "run",
+    "gather",
+    "as_completed",
+    "async_progressbar",
     # For debugging
     "pprint",
     "pp",
@@ -61,24 +123,76 @@ VERBOSE = (logging.INFO + logging.DEBUG) // 2
 DEBUG = logging.DEBUG
 SPAM = logging.DEBUG // 2
 warn = warnings.warn
+logging.addLevelName(VERBOSE, "VERBOSE")
+logging.addLevelName(SPAM, "SPAM")
+
+
+class CustomLogFormatter(logging.Formatter):
+    """Log formatter with stackprinter tracebacks
 
+    With colors it delegates to coloredlogs, without colors it is a plain
+    logging.Formatter (with the same date format), which is much faster."""
 
-class CustomLogFormatter(coloredlogs.ColoredFormatter):
     def __init__(self, format_str, *, colors):
+        super().__init__(format_str, datefmt="%Y-%m-%d %H:%M:%S")
         self.colors = colors
-        super().__init__(
-            format_str,
-            level_styles=self._coloredlogs_styles(),
-            field_styles=self._coloredlogs_styles(),
-        )
-
-    def _coloredlogs_styles(self):
-        if self.colors:
-            return None  # Default value
+        self._uses_time = super().usesTime()
+        self._time_cache: Tuple[int, str] = (-1, "")
+        self._colored_formatter = None
+        if colors:
+            import coloredlogs
+
+            self._colored_formatter = coloredlogs.ColoredFormatter(format_str)
+            self._colored_formatter.formatException = self.formatException  # type: ignore
+
+    def format(self, record):
+        if record.exc_info and not record.exc_text and record.levelno < CRITICAL:
+            record.exc_text = _record_traceback_reference(record)
+        if self._colored_formatter is None:
+            return super().format(record)
+        colored_exc_text = getattr(record, "_colored_exc_text", None)
+        if colored_exc_text is not None:
+            # Rendered in a child process, see _ProcessLogHandler
+            record = copy.copy(record)
+            record.exc_text = colored_exc_text
+        return self._colored_formatter.format(record)
+
+    def usesTime(self):
+        return self._uses_time
+
+    def formatTime(self, record, datefmt=None):
+        # The date format has a resolution of seconds
+        second = int(record.created)
+        if self._time_cache[0] != second:
+            self._time_cache = (second, super().formatTime(record, datefmt))
+        return self._time_cache[1]
+
+    def formatException(self, exc_info):
+        """Format the traceback with stackprinter, within the configured limits
+
+        The frames are rendered with variables from the innermost one, the
+        outer ones (above the maximum number of frames, or when the time budget
+        runs out) are listed like in the built-in traceback. The time budget is
+        checked between the frames and the variables, it does not interrupt a
+        single slow repr()."""
+        if _traceback_time_budget:
+            deadline = time.monotonic() + _traceback_time_budget
         else:
-            return {}  # Disable coloring
+            deadline = math.inf
+        exc_type, exc_value, exc_traceback = exc_info
+        return self._format_exception(exc_type, exc_value, exc_traceback, deadline)
+
+    def _format_exception(self, exc_type, exc_value, exc_traceback, deadline, seen=()):
+        import stackprinter.colorschemes
+        import stackprinter.formatting
+        import stackprinter.utils
+
+        if exc_type.__name__ == "ExceptionGroup":
+            # Not supported by stackprinter
+            return "".join(
+                traceback.format_exception(exc_type, exc_value, exc_traceback)
+            ).rstrip()
 
-    def formatException(self, stack_info):
         if _with_traceback_variables:
             show_variables = "like_source"
         else:
@@ -86,26 +200,248 @@ class CustomLogFormatter(coloredlogs.ColoredFormatter):
 
         if self.colors:
             color_scheme = "darkbg3"
+            colors = getattr(stackprinter.colorschemes, color_scheme).colors
+            hint_template = stackprinter.utils.get_ansi_tpl(*colors["exception_type"])
         else:
             color_scheme = "plaintext"
+            hint_template = "%s"
+
+        # The chained exceptions are rendered first, like in the built-in traceback
+        seen = {*seen, id(exc_value)}
+        chained = ""
+        cause = exc_value.__cause__
+        context = exc_value.__context__
+        if cause is not None and id(cause) not in seen:
+            chained = self._format_exception(
+                type(cause), cause, cause.__traceback__, deadline, seen
+            ) + hint_template % (
+                "\n\nThe above exception was the direct cause"
+                " of the following exception:\n\n"
+            )
+        elif (
+            context is not None
+            and not exc_value.__suppress_context__
+            and id(context) not in seen
+        ):
+            chained = self._format_exception(
+                type(context), context, context.__traceback__, deadline, seen
+            ) + hint_template % (
+                "\n\nWhile handling the above exception,"
+                " another exception occurred:\n\n"
+            )
 
-        return stackprinter.format(
-            stack_info, style=color_scheme, show_vals=show_variables
+        tracebacks = []
+        tb = exc_traceback
+        while tb is not None:
+            tracebacks.append(tb)
+            tb = tb.tb_next
+        plain_count = 0
+        if _traceback_max_frames and len(tracebacks) > _traceback_max_frames:
+            plain_count = len(tracebacks) - _traceback_max_frames
+
+        formatter = stackprinter.formatting.get_formatter(
+            style=color_scheme,
+            show_vals=show_variables,
+            truncate_vals=_traceback_max_value_length,
         )
+        select_scope = formatter.select_scope
+        formatter.select_scope = lambda frame_info: _budget_variables(
+            *select_scope(frame_info), deadline
+        )
+        rendered: List[str] = []
+        out_of_time = False
+        for index in reversed(range(plain_count, len(tracebacks))):
+            if time.monotonic() >= deadline:
+                out_of_time = True
+                plain_count = index + 1
+                break
+            try:
+                rendered.append(formatter(tracebacks[index]))
+            except Exception:
+                # Stackprinter failed, this and the outer frames are listed plain
+                plain_count = index + 1
+                break
+        rendered.reverse()
+
+        parts = [chained]
+        if out_of_time:
+            parts.append(
+                f"(The traceback could not be rendered in {_traceback_time_budget}"
+                f" s, the outer {plain_count} frame(s) are listed without"
+                " variables)\n"
+            )
+        if plain_count:
+            parts.extend(traceback.format_tb(exc_traceback, limit=plain_count))
+        parts.extend(rendered)
+        if sum(part.count("\n") for part in rendered) > 50:
+            parts.append("---- (full traceback above) ----\n")
+            parts.append(
+                stackprinter.formatting.format_summary(
+                    tracebacks[plain_count:], style=color_scheme
+                )
+            )
+            parts.append("\n")
+        parts.append(
+            stackprinter.formatting.format_exception_message(
+                exc_type, exc_value, style=color_scheme
+            )
+        )
+        return "".join(parts)
+
+
+class _OutOfTime:
+    """Placeholder of the variables which are not rendered in the time budget"""
+
+    def __repr__(self):
+        return "(not rendered, out of time)"
+
+
+class _BudgetedVariables(OrderedDict):
+    """The variables of a frame, rendered until the deadline"""
+
+    def __init__(self, variables, deadline):
+        super().__init__(variables)
+        self.deadline = deadline
+
+    def items(self):
+        # The values are rendered while iterating
+        for name, value in super().items():
+            if time.monotonic() >= self.deadline:
+                value = _OutOfTime()
+            yield name, value
+
+
+def _budget_variables(source_map, variables, deadline):
+    return source_map, _BudgetedVariables(variables, deadline)
+
+
+def _record_traceback_reference(record) -> Optional[str]:
+    """Return the reference for the repeated traceback of the record
+
+    It is decided once per record: the colored formatter sets exc_text only on
+    a copy of the record, so the other handlers would count it again."""
+    try:
+        return record._traceback_reference
+    except AttributeError:
+        reference = _repeated_traceback_reference(record.exc_info)
+        record._traceback_reference = reference
+        return reference
+
+
+def _repeated_traceback_reference(exc_info) -> Optional[str]:
+    """Count the tracebacks, return a reference for the frequently repeated ones
+
+    The tracebacks are identified by the exception type and the code locations."""
+    if _traceback_max_repeats is None:
+        return None
+    exc_type, exc_value, exc_traceback = exc_info
+    locations = []
+    tb = exc_traceback
+    while tb is not None:
+        locations.append((tb.tb_frame.f_code.co_filename, tb.tb_lineno))
+        tb = tb.tb_next
+    key = (exc_type, tuple(locations))
+    repeats = _TRACEBACK_REPEATS.get(key, 0) + 1
+    _TRACEBACK_REPEATS[key] = repeats
+    if repeats <= _traceback_max_repeats:
+        return None
+    return (
+        f"(Traceback #{repeats} of {_traceback_description(key)},"
+        f" displayed above) {exc_type.__name__}: {exc_value}"
+    )
+
+
+def _traceback_description(key) -> str:
+    exc_type, locations = key
+    if not locations:
+        return exc_type.__name__
+    filename, lineno = locations[-1]
+    return f"{exc_type.__name__} at {pathlib.PurePath(filename).name}:{lineno}"
+
+
+def _log_suppressed_tracebacks() -> None:
+    if _traceback_max_repeats is None:
+        return
+    logger = getLogger(__name__)
+    for key, repeats in _TRACEBACK_REPEATS.items():
+        if repeats > _traceback_max_repeats:
+            logger.warning(
+                f"Traceback of {_traceback_description(key)} was repeated"
+                f" {repeats - _traceback_max_repeats} more times"
+            )
 
 
 class ConsoleLogHandler(logging.StreamHandler):
-    def __init__(self):
+    """Writes the log messages without breaking the progressbars
+
+    The messages are written through tqdm.write() only if there is a running
+    progressbar and stdout is a terminal. Otherwise they are written directly
+    to stdout.
+
+    With batch_size > 1 the messages are collected, and written together
+    (with one redraw of the progressbars), when
+        - batch_size messages are collected
+        - batch_interval seconds elapsed since the first collected message
+        - a message with WARNING or higher level arrives
+        - the handler is flushed (also at exit)"""
+
+    def __init__(self, *, batch_size: int = 1, batch_interval: float = 0.2):
         logging.StreamHandler.__init__(self)
         self.setFormatter(
             CustomLogFormatter(
                 "%(levelname)s %(name)s %(message)s", colors=_with_colors
             )
         )
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._batch: List[str] = []
+        self._batch_timer: Optional[threading.Timer] = None
+        self._stdout_is_tty = sys.stdout.isatty()
+
+    def format(self, record):
+        if _log_stats is None:
+            return super().format(record)
+        start = time.perf_counter()
+        msg = super().format(record)
+        _log_stats.add_handler_time(
+            "console", records=1, format_time=time.perf_counter() - start
+        )
+        return msg
 
     def emit(self, record):
         msg = self.format(record)
-        tqdm.tqdm.write(msg)
+        if self.batch_size <= 1:
+            self._write(msg)
+            return
+        self._batch.append(msg)
+        if len(self._batch) >= self.batch_size or record.levelno >= WARNING:
+            self.flush()
+        elif self._batch_timer is None:
+            self._batch_timer = threading.Timer(self.batch_interval, self.flush)
+            self._batch_timer.daemon = True
+            self._batch_timer.start()
+
+    def flush(self):
+        with self.lock:  # type: ignore
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+                self._batch_timer = None
+            if self._batch:
+                msg = "\n".join(self._batch)
+                self._batch.clear()
+                self._write(msg)
+        super().flush()
+
+    def _write(self, msg):
+        start = time.perf_counter()
+        if self._stdout_is_tty and _progressbar_is_running():
+            import tqdm
+
+            tqdm.tqdm.write(msg)
+        else:
+            sys.stdout.write(msg + "\n")
+        if _log_stats is not None:
+            _log_stats.add_handler_time("console", io_time=time.perf_counter() - start)
 
 
 def _exception_handler(exc_type, exc_value, exc_traceback):
@@ -113,15 +449,249 @@ def _exception_handler(exc_type, exc_value, exc_traceback):
         sys.__excepthook__(exc_type, exc_value, exc_traceback)
         return
 
+    # A failing step must not prevent the others and the crash report
+    for step in (
+        _stop_profiling,
+        _stop_sampling,
+        _stop_memory_tracing,
+        _checkpoint_resumables,
+        _flush_persisted_states,
+        _stop_log_queue,
+        _dump_flight_recorder,
+    ):
+        try:
+            step()
+        except Exception:
+            getLogger(__name__).exception(f"{step.__name__}() failed before the crash")
     message = f"Uncaught {exc_type.__name__}: {exc_value}"
     getLogger().critical(message, exc_info=exc_value)
 
 
-class MoreLevelsLogger(logging.getLoggerClass()):  # type: ignore
-    def __init__(self, *args, **kw):
-        logging.Logger.__init__(self, *args, **kw)
-        self.parent = logging.getLogger()
+def _dump_flight_recorder() -> None:
+    if _flight_recorder is not None:
+        _flight_recorder.dump()
+
+
+class _FlightRecorderHandler(logging.Handler):
+    """Keeps the last records below the console level, without formatting them
+
+    They are written out only on an uncaught exception, to the log file
+    (see setup_file_logging) or to the console."""
+
+    def __init__(self, capacity: int, console_log_level: int):
+        super().__init__()
+        self.records: deque = deque(maxlen=capacity)
+        self.console_log_level = console_log_level
+
+    def handle(self, record):
+        # Without filters and locking, deque.append() is thread-safe
+        if record.levelno < self.console_log_level:
+            self.records.append(record)
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+    def dump(self) -> None:
+        target = _file_log_handler or _console_log_handler
+        if target is None:
+            return
+        # The records with the level of the target are already written there
+        records = [record for record in self.records if record.levelno < target.level]
+        self.records.clear()
+        if not records:
+            return
+        self._dump_message(
+            target, f"The last {len(records)} log records before the crash:"
+        )
+        for record in records:
+            target.handle(record)
+        self._dump_message(target, "End of the last log records")
+
+    @staticmethod
+    def _dump_message(target: logging.Handler, msg: str) -> None:
+        target.handle(logging.LogRecord(__name__, INFO, __file__, 0, msg, None, None))
+
+
+class _AsyncLogHandler(logging.handlers.QueueHandler):
+    """Puts the records onto a queue, the handlers are called by a background thread"""
+
+    def prepare(self, record):
+        # Merge the arguments into the message on the caller's thread, because
+        # they may change later. The traceback formatting is left for the listener.
+        # The record is copied, because other handlers (e.g. the flight recorder)
+        # may keep the original one.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _add_handler(handler: logging.Handler) -> None:
+    """Attach a handler to the root logger, or to the background listener"""
+    if _log_queue_listener is None:
+        logging.getLogger().addHandler(handler)
+        return
+    _log_queue_listener.handlers = (*_log_queue_listener.handlers, handler)
+    # The records rejected by every handler are not even queued (the root logger
+    # may have a lower level, e.g. for the flight recorder)
+    level = min(
+        listener_handler.level for listener_handler in _log_queue_listener.handlers
+    )
+    for root_handler in logging.getLogger().handlers:
+        if isinstance(root_handler, _AsyncLogHandler):
+            root_handler.setLevel(level)
+
+
+def _start_log_queue() -> None:
+    global _log_queue_listener
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _log_queue_listener = logging.handlers.QueueListener(
+        log_queue, respect_handler_level=True
+    )
+    _log_queue_listener.start()
+    logging.getLogger().addHandler(_AsyncLogHandler(log_queue))
+    atexit.register(_stop_log_queue)
+
+
+def _stop_log_queue() -> None:
+    """Write out every queued record, and continue logging synchronously"""
+    global _log_queue_listener
+    if _log_queue_listener is None:
+        return
+    listener = _log_queue_listener
+    _log_queue_listener = None
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, _AsyncLogHandler):
+            root_logger.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        root_logger.addHandler(handler)
+
+
+class _LogStats:
+    """Counters of the logging pipeline, see log_stats()"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records: Dict[str, Dict[int, int]] = {}
+        self.filtered: Dict[str, Dict[int, int]] = {}
+        self.handlers: Dict[str, List] = {}  # name -> [records, format, I/O time]
+
+    def count(self, counters, name, level) -> None:
+        with self.lock:
+            levels = counters.get(name)
+            if levels is None:
+                levels = counters[name] = {}
+            levels[level] = levels.get(level, 0) + 1
+
+    def add_handler_time(self, name, *, records=0, format_time=0.0, io_time=0.0):
+        with self.lock:
+            handler_stats = self.handlers.get(name)
+            if handler_stats is None:
+                handler_stats = self.handlers[name] = [0, 0.0, 0.0]
+            handler_stats[0] += records
+            handler_stats[1] += format_time
+            handler_stats[2] += io_time
+
+    def snapshot(self) -> dict:
+        def by_level_name(counters):
+            return {
+                name: {
+                    logging.getLevelName(level): count
+                    for level, count in sorted(levels.items())
+                }
+                for name, levels in counters.items()
+            }
+
+        with self.lock:
+            return {
+                "records": by_level_name(self.records),
+                "filtered": by_level_name(self.filtered),
+                "handlers": {
+                    name: {
+                        "records": records,
+                        "format_time": format_time,
+                        "io_time": io_time,
+                    }
+                    for name, (records, format_time, io_time) in self.handlers.items()
+                },
+            }
+
+
+class _LogStatsHandler(logging.Handler):
+    """Counts the records reaching the root logger, without formatting them"""
+
+    def handle(self, record):
+        if _log_stats is not None:
+            _log_stats.count(_log_stats.records, record.name, record.levelno)
+        return True
+
+
+def _counting_is_enabled_for(self, level):
+    """MoreLevelsLogger.isEnabledFor(), which counts the filtered records"""
+    enabled = logging.Logger.isEnabledFor(self, level)
+    if not enabled and _log_stats is not None:
+        _log_stats.count(_log_stats.filtered, self.name, level)
+    return enabled
+
+
+def _enable_log_stats() -> None:
+    global _log_stats
+    if _log_stats is not None:
+        return
+    _log_stats = _LogStats()
+    # Patched only if enabled, so the disabled messages are not slowed down otherwise
+    MoreLevelsLogger.isEnabledFor = _counting_is_enabled_for  # type: ignore
+    logging.getLogger().addHandler(_LogStatsHandler())
+
+
+def log_stats() -> Optional[dict]:
+    """Return the counters of the logging pipeline
+
+    They are collected only if enabled with --log-stats or the log_stats
+    option of bootstrap(), otherwise it returns None.
+
+    records - number of the records per logger and level
+    filtered - number of the rejected records per logger and level
+        (by the level of the loggers created by getLogger)
+    handlers - number of the records, the formatting and the I/O time (seconds)
+        of the console and file handlers"""
+    if _log_stats is None:
+        return None
+    return _log_stats.snapshot()
+
+
+def _log_stats_summary() -> None:
+    if _log_stats is None or not _log_stats_at_exit:
+        return
+    stats = _log_stats.snapshot()
+    lines = ["Log statistics:"]
+    for name in sorted(set(stats["records"]) | set(stats["filtered"])):
+        counts = [
+            f"{level} {count}"
+            for level, count in stats["records"].get(name, {}).items()
+        ]
+        counts.extend(
+            f"filtered {level} {count}"
+            for level, count in stats["filtered"].get(name, {}).items()
+        )
+        lines.append(f"  {name}: {', '.join(counts)}")
+    for name, handler_stats in stats["handlers"].items():
+        lines.append(
+            f"  {name} handler: {handler_stats['records']} records,"
+            f" formatting {_format_duration(handler_stats['format_time'])},"
+            f" I/O {_format_duration(handler_stats['io_time'])}"
+        )
+    getLogger(__name__).info("\n".join(lines))
 
+
+# Registered before the other reports at exit, so it runs after them
+atexit.register(_log_stats_summary)
+
+
+class MoreLevelsLogger(logging.getLoggerClass()):  # type: ignore
     def spam(self, msg, *args, **kw):
         if self.isEnabledFor(SPAM):
             self._log(SPAM, msg, args, **kw, stacklevel=2)
@@ -130,15 +700,149 @@ class MoreLevelsLogger(logging.getLoggerClass()):  # type: ignore
         if self.isEnabledFor(VERBOSE):
             self._log(VERBOSE, msg, args, **kw, stacklevel=2)
 
+    def timed(self, label: str) -> "_Timed":
+        """Measure the duration of a code block, or the calls of a function
+
+        Use it as a context manager or as a decorator:
+
+            with logger.timed("download"):
+                ...
+
+            @logger.timed("parse")
+            def parse(text):
+                ...
+
+        The count, total, median (p50) and 95th percentile (p95) of the
+        durations are logged per label at exit."""
+        return _Timed(_timing(self, label))
+
+
+# Set once, so the loggers of getLogger() are MoreLevelsLogger instances even
+# before bootstrap(). The loggers created earlier (e.g. by libraries) are not changed.
+logging.setLoggerClass(MoreLevelsLogger)
+
+_TIMINGS_SAMPLE_SIZE = 10_000
+_TIMINGS: Dict[Tuple[str, str], "_Timing"] = {}
+_timings_lock = threading.Lock()
+
+
+class _Timing:
+    """Aggregated durations of a label of MoreLevelsLogger.timed()
+
+    The percentiles are estimated from a uniform sample of the durations."""
+
+    __slots__ = ("logger", "label", "count", "total", "sample")
+
+    def __init__(self, logger, label):
+        self.logger = logger
+        self.label = label
+        self.count = 0
+        self.total = 0.0
+        self.sample: List[float] = []
+
+    def add(self, duration: float) -> None:
+        with _timings_lock:
+            self.count += 1
+            self.total += duration
+            if len(self.sample) < _TIMINGS_SAMPLE_SIZE:
+                self.sample.append(duration)
+                return
+            import random
+
+            # Reservoir sampling
+            index = random.randrange(self.count)
+            if index < _TIMINGS_SAMPLE_SIZE:
+                self.sample[index] = duration
+
+    def percentile(self, percent: float) -> float:
+        sample = sorted(self.sample)
+        # Nearest-rank method
+        return sample[max(0, math.ceil(len(sample) * percent / 100) - 1)]
+
+
+def _timing(logger, label: str) -> _Timing:
+    key = (logger.name, label)
+    with _timings_lock:
+        timing = _TIMINGS.get(key)
+        if timing is None:
+            timing = _TIMINGS[key] = _Timing(logger, label)
+    return timing
 
-def _setup_logger(console_log_level):
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        prettyprinter.install_extras()
 
-    logging.setLoggerClass(MoreLevelsLogger)
-    logging.addLevelName(VERBOSE, "VERBOSE")
-    logging.addLevelName(SPAM, "SPAM")
+class _Timed:
+    """Context manager and decorator of MoreLevelsLogger.timed()"""
+
+    def __init__(self, timing: _Timing):
+        self.timing = timing
+        self.starts: List[float] = []
+
+    def __enter__(self):
+        self.starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timing.add(time.perf_counter() - self.starts.pop())
+
+    def __call__(self, func: Callable) -> Callable:
+        import inspect
+
+        timing = self.timing
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def timed_coroutine(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timing.add(time.perf_counter() - start)
+
+            return timed_coroutine
+
+        @functools.wraps(func)
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.add(time.perf_counter() - start)
+
+        return timed_function
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    return f"{seconds * 1000:.3f} ms"
+
+
+def _log_timings() -> None:
+    for timing in list(_TIMINGS.values()):
+        if timing.count:
+            timing.logger.info(
+                f"Timing of {timing.label}: count={timing.count},"
+                f" total={_format_duration(timing.total)},"
+                f" p50={_format_duration(timing.percentile(50))},"
+                f" p95={_format_duration(timing.percentile(95))}"
+            )
+
+
+atexit.register(_log_timings)
+
+
+def _setup_logger(
+    console_log_level,
+    *,
+    async_logging=False,
+    batched_console=False,
+    flight_recorder=0,
+    logger_levels=(),
+    log_stats=False,
+):
+    global _console_log_handler
+    global _flight_recorder
+    global _logger_levels
+    import coloredlogs
 
     if sys.platform == "win32":
         # In Windows the default black is black, which is invisible on the default terminal.
@@ -146,14 +850,85 @@ def _setup_logger(console_log_level):
     coloredlogs.DEFAULT_FIELD_STYLES["name"] = {"color": "cyan", "faint": True}
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(min(console_log_level, logging.DEBUG))
+    root_logger.setLevel(console_log_level)
+    if log_stats:
+        _enable_log_stats()
+    if flight_recorder:
+        root_logger.setLevel(SPAM)
+        _flight_recorder = _FlightRecorderHandler(flight_recorder, console_log_level)
+        root_logger.addHandler(_flight_recorder)
+    if async_logging:
+        _start_log_queue()
+
+    if batched_console:
+        console_log_handler = ConsoleLogHandler(batch_size=100)
+    else:
+        console_log_handler = ConsoleLogHandler()
+    console_log_handler.setLevel(
+        min([console_log_level, *(level for _, level in logger_levels)])
+    )
+    if logger_levels:
+        console_log_handler.addFilter(
+            _ConsoleLevelFilter(console_log_level, logger_levels)
+        )
+    _add_handler(console_log_handler)
+    _console_log_handler = console_log_handler
 
-    console_log_handler = ConsoleLogHandler()
-    console_log_handler.setLevel(console_log_level)
-    root_logger.addHandler(console_log_handler)
+    # The loggers without their own level use the level of the root logger,
+    # so the disabled records are rejected before creating them.
+    _logger_levels = list(logger_levels)
+    _set_logger_levels(_logger_levels)
 
     sys.excepthook = _exception_handler
     logging.captureWarnings(True)
+    atexit.register(_log_suppressed_tracebacks)
+    atexit.register(_log_suppressed_messages)
+
+
+def _set_logger_levels(logger_levels) -> None:
+    for name, level in logger_levels:
+        getLogger(name).setLevel(level)
+
+
+class _ConsoleLevelFilter(logging.Filter):
+    """Rejects the records below the console level, except the records of the
+    loggers with a lower level set by --log-level (and of their children)
+
+    The console handler has the lowest of these levels, and the root logger may
+    have an even lower one (e.g. for the log file or the flight recorder)."""
+
+    def __init__(self, console_log_level: int, logger_levels):
+        super().__init__()
+        self.console_log_level = console_log_level
+        self.logger_levels = dict(logger_levels)
+
+    def filter(self, record):
+        if record.levelno >= self.console_log_level:
+            return True
+        name = record.name
+        while True:
+            level = self.logger_levels.get(name)
+            if level is not None:
+                return record.levelno >= level
+            if "." not in name:
+                return False
+            name = name.rpartition(".")[0]
+
+
+def _caller_filename() -> Optional[str]:
+    """Return the filename of the first caller outside of this module
+
+    Walks the frame objects only, without reading any source file."""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back  # type: ignore
+    if frame is None:
+        return None
+    return frame.f_code.co_filename
+
+
+def _first_not_none(*values):
+    return next(value for value in values if value is not None)
 
 
 def _log_level_from_verbosity(console_verbosity):
@@ -183,29 +958,166 @@ def getLogger(name: Optional[str] = None) -> MoreLevelsLogger:
     Can be used as the logging.getLogger() method.
     Extends built-in logger with levels: verbose, spam
     """
-    logger = MoreLevelsLogger(name)
     if name is None:
-        caller_file = None
-        this_file = pathlib.Path(__file__).absolute()
-        for frame in inspect.stack():
-            caller_file = pathlib.Path(frame.filename).absolute()
-            if caller_file != this_file:
-                logger.name = caller_file.stem
-                break
-    return logger
+        caller_file = _caller_filename()
+        # Without a caller outside of this module (e.g. in sys.excepthook)
+        # the name is "None", not the root logger
+        name = pathlib.PurePath(caller_file).stem if caller_file else "None"
+    # Registered in the logging manager, so logging.getLogger(name) returns the
+    # same logger, and the cached levels are cleared on changing the log levels.
+    return logging.getLogger(name)  # type: ignore
+
+
+class _ThrottleState:
+    """Throttling state of a message (or key) for the rate limited log helpers"""
+
+    __slots__ = ("logger", "level", "msg", "count", "last_time", "tokens", "suppressed")
+
+    def __init__(self, logger, level, msg):
+        self.logger = logger
+        self.level = level
+        self.msg = msg
+        self.count = 0
+        self.last_time: Optional[float] = None
+        self.tokens = 0.0
+        self.suppressed = 0
+
+
+_THROTTLE_STATES_MAXSIZE = 10_000
+_THROTTLE_STATES: "OrderedDict[Hashable, _ThrottleState]" = OrderedDict()
+_throttle_lock = threading.Lock()
+
+
+def _throttle_state(
+    kind: str, key: Hashable, logger: logging.Logger, level: int, msg
+) -> _ThrottleState:
+    """Return the state of the key, the least recently used keys are forgotten"""
+    full_key = (kind, key)
+    state = _THROTTLE_STATES.get(full_key)
+    if state is None:
+        state = _ThrottleState(logger, level, msg)
+        _THROTTLE_STATES[full_key] = state
+        if len(_THROTTLE_STATES) > _THROTTLE_STATES_MAXSIZE:
+            _THROTTLE_STATES.popitem(last=False)
+    else:
+        _THROTTLE_STATES.move_to_end(full_key)
+    return state
+
+
+def _throttle_key(logger, level: int, msg, key: Hashable) -> Hashable:
+    """The keys are separate per logger and level, so the same message of
+    two modules is counted (and reported) separately"""
+    return (logger.name, level, msg if key is None else key)
 
 
-_WARNING_ONCE_CACHE = set()
+def _throttled_message(state: _ThrottleState, allowed: bool, msg):
+    """Return the message to be logged, or None if it is suppressed"""
+    if not allowed:
+        state.suppressed += 1
+        return None
+    if state.suppressed:
+        msg = f"{msg} ({state.suppressed} similar messages were suppressed)"
+        state.suppressed = 0
+    return msg
+
+
+def _log_suppressed_messages() -> None:
+    for state in _THROTTLE_STATES.values():
+        if state.suppressed:
+            state.logger.log(
+                state.level,
+                f"{state.suppressed} similar messages were suppressed: {state.msg}",
+            )
+            state.suppressed = 0
 
 
 def warning_once(msg, *args, **kwargs):
     """Issue a warning only once
 
-    Only the first call will be logged with the same message."""
-    if msg in _WARNING_ONCE_CACHE:
-        return
-    _WARNING_ONCE_CACHE.add(msg)
-    getLogger().warning(msg, *args, **kwargs)
+    Only the first call will be logged with the same message.
+    (At most 10 000 messages are remembered.)"""
+    logger = getLogger()
+    with _throttle_lock:
+        state = _throttle_state("once", msg, logger, WARNING, msg)
+        state.count += 1
+    if state.count == 1:
+        state.logger.warning(msg, *args, **kwargs)
+
+
+def log_every_n(level: int, msg, n: int, *args, key: Hashable = None, **kwargs):
+    """Log only the 1st, (n+1)th, (2n+1)th... occurrence of a message
+
+    The occurrences are counted per key, which is the message by default,
+    so use lazy formatting: log_every_n(INFO, "Item %s failed", 100, item_id)
+    (The key is separate for every calling module and level.)
+    The number of the suppressed messages is appended to the next logged one."""
+    logger = getLogger()
+    with _throttle_lock:
+        state = _throttle_state(
+            "every_n", _throttle_key(logger, level, msg, key), logger, level, msg
+        )
+        if not state.logger.isEnabledFor(level):
+            return
+        state.count += 1
+        msg = _throttled_message(state, (state.count - 1) % n == 0, msg)
+    if msg is not None:
+        state.logger.log(level, msg, *args, **kwargs)
+
+
+def log_at_most_every(
+    level: int, msg, seconds: float, *args, key: Hashable = None, **kwargs
+):
+    """Log a message at most once in the given seconds
+
+    See log_every_n() for the key and the suppressed messages."""
+    logger = getLogger()
+    with _throttle_lock:
+        state = _throttle_state(
+            "seconds", _throttle_key(logger, level, msg, key), logger, level, msg
+        )
+        if not state.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        allowed = state.last_time is None or now - state.last_time >= seconds
+        if allowed:
+            state.last_time = now
+        msg = _throttled_message(state, allowed, msg)
+    if msg is not None:
+        state.logger.log(level, msg, *args, **kwargs)
+
+
+def log_rate_limited(
+    level: int,
+    msg,
+    rate: float,
+    *args,
+    burst: int = 1,
+    key: Hashable = None,
+    **kwargs,
+):
+    """Log a message at most `rate` times per second, with bursts of `burst` messages
+
+    It uses a token bucket per key. See log_every_n() for the key and the
+    suppressed messages."""
+    logger = getLogger()
+    with _throttle_lock:
+        state = _throttle_state(
+            "rate", _throttle_key(logger, level, msg, key), logger, level, msg
+        )
+        if not state.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if state.last_time is None:
+            state.tokens = burst
+        else:
+            state.tokens = min(burst, state.tokens + (now - state.last_time) * rate)
+        state.last_time = now
+        allowed = state.tokens >= 1
+        if allowed:
+            state.tokens -= 1
+        msg = _throttled_message(state, allowed, msg)
+    if msg is not None:
+        state.logger.log(level, msg, *args, **kwargs)
 
 
 args: argparse.Namespace  # Parsed arguments, will be set during bootstrap
@@ -240,6 +1152,77 @@ parser.add_argument(
     action="store_true",
     help="Do not display variables in traceback context",
 )
+parser.add_argument(
+    "--traceback-max-value-length",
+    type=int,
+    metavar="CHARS",
+    help="Truncate the variable values in traceback context (default: 500)",
+)
+parser.add_argument(
+    "--traceback-max-frames",
+    type=int,
+    metavar="FRAMES",
+    help="Display variables only in the innermost frames (default: 100)",
+)
+parser.add_argument(
+    "--traceback-time-budget",
+    type=float,
+    metavar="SECONDS",
+    help="List the rest of the traceback plain after this (default: 10)",
+)
+
+
+def _logger_level_argument(value: str) -> Tuple[str, int]:
+    name, separator, level_name = value.rpartition("=")
+    level = logging.getLevelName(level_name.upper())
+    if not separator or not name or not isinstance(level, int):
+        raise argparse.ArgumentTypeError(f"expected NAME=LEVEL, got: {value!r}")
+    return name, level
+
+
+parser.add_argument(
+    "--log-level",
+    action="append",
+    type=_logger_level_argument,
+    metavar="NAME=LEVEL",
+    help="Set the log level of a logger, like mymodule=SPAM."
+    " Can be applied multiple times",
+)
+
+
+parser.add_argument(
+    "--log-stats",
+    action="store_true",
+    help="Log the statistics of logging at exit: the number of the records"
+    " (also the filtered ones), the formatting and I/O time of the handlers",
+)
+parser.add_argument(
+    "--trace-memory",
+    action="store_true",
+    help="Trace the memory allocations with tracemalloc, log the peak usage and"
+    " the top allocation sites at exit. Display the RSS in the progressbars",
+)
+parser.add_argument(
+    "--profile",
+    nargs="?",
+    const="",
+    metavar="PATH",
+    help="Profile the script (the main thread) with cProfile, and write the stats"
+    " to PATH (default: the name of the script with .prof suffix)."
+    " With .collapsed or .folded suffix write collapsed stacks (for flame graphs)",
+)
+
+
+parser.add_argument(
+    "--sampling-profiler",
+    nargs="?",
+    type=float,
+    const=0.01,
+    metavar="SECONDS",
+    help="Sample the stacks of all threads in every SECONDS (default: 0.01)."
+    " The stack counts are written in collapsed format (for flame graphs) to the"
+    " name of the script with .samples.collapsed suffix at exit, and on SIGUSR1",
+)
 
 
 def add_argument(*args, **kw) -> None:
@@ -247,17 +1230,45 @@ def add_argument(*args, **kw) -> None:
     parser.add_argument(*args, **kw)
 
 
+class _FileLogHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler, which measures its formatting and I/O time for log_stats()"""
+
+    _format_time = 0.0
+
+    def format(self, record):
+        if _log_stats is None:
+            return super().format(record)
+        start = time.perf_counter()
+        msg = super().format(record)
+        self._format_time += time.perf_counter() - start
+        return msg
+
+    def emit(self, record):
+        if _log_stats is None:
+            return super().emit(record)
+        # Called with the lock of the handler
+        self._format_time = 0.0
+        start = time.perf_counter()
+        super().emit(record)
+        _log_stats.add_handler_time(
+            "file",
+            records=1,
+            format_time=self._format_time,
+            io_time=time.perf_counter() - start - self._format_time,
+        )
+
+
 def setup_file_logging(*, level: str = "INFO", filename: Optional[str] = None) -> None:
     """Setups logging to file
 
     The default filename is the name of the main script.
     It uses RotatingFileHandler."""
+    global _file_log_handler
     if filename is None:
-        caller_module = inspect.getmodule(inspect.stack()[1][0])
-        module_file: str = caller_module.__file__  # type:ignore
+        module_file: str = _caller_filename()  # type: ignore
         filename = pathlib.Path(module_file).with_suffix(".log").as_posix()
 
-    file_log_handler = logging.handlers.RotatingFileHandler(
+    file_log_handler = _FileLogHandler(
         filename, encoding="utf-8", maxBytes=10 * 1024 * 1024, backupCount=9
     )
     formatter = CustomLogFormatter(
@@ -265,22 +1276,521 @@ def setup_file_logging(*, level: str = "INFO", filename: Optional[str] = None) -
     )
     file_log_handler.setFormatter(formatter)
     file_log_handler.setLevel(level)
-    logging.getLogger().addHandler(file_log_handler)
+    _add_handler(file_log_handler)
+    _file_log_handler = file_log_handler
 
+    root_logger = logging.getLogger()
+    if file_log_handler.level < root_logger.getEffectiveLevel():
+        root_logger.setLevel(file_log_handler.level)
+
+
+class ProcessLogging:
+    """Log settings of the parent process and the queue for the child processes
+
+    Created by start_process_logging(), used by setup_process_logging()"""
+
+    def __init__(self, log_queue):
+        self.queue = log_queue
+        self.root_level = logging.getLogger().getEffectiveLevel()
+        self.logger_levels = list(_logger_levels)
+        self.settings = {
+            name: globals()[name]
+            for name in [
+                "_with_colors",
+                "_with_traceback_variables",
+                "_traceback_max_value_length",
+                "_traceback_max_frames",
+                "_traceback_time_budget",
+            ]
+        }
+
+
+class _ProcessLogHandler(logging.handlers.QueueHandler):
+    """Sends the log records of a child process to the parent process"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        format_str = "%(levelname)s %(name)s %(message)s"
+        self.setFormatter(CustomLogFormatter(format_str, colors=False))
+        self.colored_formatter = None
+        if _with_colors:
+            self.colored_formatter = CustomLogFormatter(format_str, colors=True)
+
+    def prepare(self, record):
+        # The tracebacks and the arguments cannot be pickled,
+        # so they are rendered in the child process. The traceback is rendered
+        # plain for the plain handlers (e.g. the log file) of the parent, and
+        # also colored for the colored ones.
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatter.formatException(record.exc_info)  # type: ignore
+                if self.colored_formatter is not None:
+                    record._colored_exc_text = self.colored_formatter.formatException(
+                        record.exc_info
+                    )
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _ProcessLogListener(logging.handlers.QueueListener):
+    """Passes the log records of the child processes to the root logger"""
+
+    def handle(self, record):
+        logging.getLogger().handle(record)
+
+
+def start_process_logging(mp_context=None) -> ProcessLogging:
+    """Start receiving log records from child processes
+
+    mp_context - the multiprocessing context of the child processes (if not default)
+
+    Call it after bootstrap, and pass the result to setup_process_logging()
+    in the child processes, for example:
+
+        process_logging = scripthelper.start_process_logging()
+        with ProcessPoolExecutor(
+            initializer=scripthelper.setup_process_logging,
+            initargs=(process_logging,),
+        ) as executor:
+            ...
+
+    The records are written by the handlers of this (parent) process, with the
+    same log levels and colors, without breaking the progressbars."""
+    if mp_context is None:
+        import multiprocessing
+
+        mp_context = multiprocessing.get_context()
+    log_queue = mp_context.Queue()
+    listener = _ProcessLogListener(log_queue)
+    listener.start()
+    atexit.register(listener.stop)
+    return ProcessLogging(log_queue)
+
+
+def setup_process_logging(process_logging: ProcessLogging) -> None:
+    """Setup logging in a child process, see start_process_logging()
+
+    The log records (with the rendered tracebacks) are sent to the parent process,
+    the handlers inherited from the parent process or set up by bootstrap
+    in the child process are removed."""
+    global _log_queue_listener
+    global _console_log_handler
+    global _file_log_handler
+    global _flight_recorder
+    global _logger_levels
+
+    globals().update(process_logging.settings)
+    _log_queue_listener = None
+    _console_log_handler = None
+    _file_log_handler = None
+    _flight_recorder = None
+    _logger_levels = process_logging.logger_levels
 
-def progressbar(*args, disable=None, **kwargs):
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_ProcessLogHandler(process_logging.queue))
+    root_logger.setLevel(process_logging.root_level)
+    _set_logger_levels(_logger_levels)
+    logging.captureWarnings(True)
+
+
+def progressbar(
+    *args,
+    disable=None,
+    log_interval: Optional[float] = None,
+    show_memory: Optional[bool] = None,
+    **kwargs,
+):
     """See tqdm.tqdm
 
     The default value for 'disable' is None, meaning
         - enable progressbar on terminals
         - disable progressbar on non-tty
-    (checking the type of stderr)"""
+    (checking the type of stderr)
+
+    log_interval - if the progressbar is disabled on non-tty, log the progress
+        (count, elapsed and remaining time, rate) in every log_interval seconds
+        instead. The default value can be set in bootstrap(). 0 means never.
+    show_memory - display the current and the peak RSS of the process in the
+        postfix. The default is True with --trace-memory."""
+    import tqdm
+
+    if show_memory is None:
+        show_memory = _trace_memory
+    if log_interval is None:
+        log_interval = _progressbar_log_interval
+    if disable is None and log_interval:
+        file = kwargs.get("file") or sys.stderr
+        if not file.isatty():
+            kwargs.setdefault(
+                "bar_format",
+                "{desc}: {n_fmt}/{total_fmt}"
+                " [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
+            )
+            kwargs.setdefault("desc", "Progress")
+            kwargs.update(
+                file=_NullFile(),
+                disable=False,
+                mininterval=log_interval,
+                maxinterval=log_interval,
+            )
+            logging_class = _logging_progressbar_class()
+            if show_memory:
+                logging_class = _memory_progressbar_class(logging_class)
+            return logging_class(*args, logger=getLogger(), **kwargs)
+
     kwargs["disable"] = disable
-    return tqdm.tqdm(*args, **kwargs)
+    if show_memory:
+        bar = _memory_progressbar_class(tqdm.tqdm)(*args, **kwargs)
+    else:
+        bar = tqdm.tqdm(*args, **kwargs)
+    if not bar.disable:
+        _progressbars.add(bar)
+    return bar
+
+
+class _NullFile:
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _logging_progressbar_class():
+    import tqdm
+
+    class LoggingProgressbar(tqdm.tqdm):
+        """Logs the progress instead of displaying the progressbar"""
+
+        def __init__(self, *args, logger, **kwargs):
+            self.logger = logger
+            self.logged_n = None
+            super().__init__(*args, **kwargs)
+
+        def display(self, msg=None, pos=None):
+            if self.n != self.logged_n:
+                self.logged_n = self.n
+                self.logger.info(self.__str__())
+            return True
+
+    return LoggingProgressbar
+
+
+@functools.lru_cache(maxsize=None)
+def _memory_progressbar_class(base):
+    class MemoryProgressbar(base):
+        """Displays the current and the peak RSS in the postfix"""
+
+        @property
+        def format_dict(self):
+            format_dict = super().format_dict
+            memory = _format_memory_usage()
+            if memory:
+                postfix = format_dict.get("postfix")
+                format_dict["postfix"] = f"{postfix}, {memory}" if postfix else memory
+            return format_dict
+
+    return MemoryProgressbar
+
+
+def _memory_usage() -> Tuple[Optional[int], Optional[int]]:
+    """Return the current and the peak RSS of the process in bytes (None if unknown)
+
+    The current RSS is known on Linux, the peak on the Unix-like systems."""
+    rss = None
+    peak = None
+    try:
+        with open("/proc/self/statm", "rb") as file:
+            rss = int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        pass
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes, except on macOS
+        peak *= 1 if sys.platform == "darwin" else 1024
+        if rss is not None:
+            peak = max(peak, rss)
+    return rss, peak
+
+
+def _format_memory_usage() -> str:
+    rss, peak = _memory_usage()
+    parts = []
+    if rss is not None:
+        parts.append(f"RSS {_format_size(rss)}")
+    if peak is not None:
+        parts.append(f"peak {_format_size(peak)}")
+    return ", ".join(parts)
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size:.0f} B"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def progress_counter(
+    iterable: Iterable, *, interval: float = 0.1, **kwargs
+) -> Iterator:
+    """Iterate with a progressbar, with low overhead for very tight loops
+
+    It returns an iterator only (not a tqdm object). When the progressbar
+    is disabled (see progressbar), it is the iterator of the iterable itself.
+    Otherwise the progressbar is updated in batches of at most 128 items,
+    about once in `interval` seconds. The keyword arguments are passed to
+    progressbar()."""
+    if "total" not in kwargs and hasattr(iterable, "__len__"):
+        kwargs["total"] = len(iterable)  # type: ignore
+    bar = progressbar(**kwargs)
+    if bar.disable:
+        return iter(iterable)
+    return _progress_counter(iter(iterable), bar, interval)
+
+
+# The clock is checked only between batches, so the batches are kept small
+# enough to notice in time when the items get slower
+_PROGRESS_COUNTER_MAX_BATCH = 128
+
+
+def _progress_counter(iterator, bar, interval):
+    batch_size = 1
+    try:
+        while True:
+            start = time.monotonic()
+            count = 0
+            for count, item in enumerate(itertools.islice(iterator, batch_size), 1):
+                yield item
+            if count:
+                bar.update(count)
+            if count < batch_size:
+                return
+            # Adapt the batch size to the interval
+            elapsed = time.monotonic() - start
+            if elapsed < interval / 2:
+                batch_size = min(batch_size * 2, _PROGRESS_COUNTER_MAX_BATCH)
+            else:
+                batch_size = max(1, int(batch_size * interval / 2 / elapsed))
+    finally:
+        bar.close()
+
+
+def _progressbar_is_running() -> bool:
+    # Closed progressbars are disabled
+    return any(not bar.disable for bar in _progressbars)
+
+
+def _map_chunk(func, chunk, skip_errors):
+    """Process a chunk of parallel_map() in a worker"""
+    if not skip_errors:
+        return [func(item) for item in chunk]
+    results = []
+    for item in chunk:
+        try:
+            results.append(func(item))
+        except Exception:
+            code = getattr(func, "__code__", None)
+            name = pathlib.PurePath(code.co_filename).stem if code else __name__
+            getLogger(name).exception(f"Processing {item!r} failed")
+    return results
+
+
+def parallel_map(
+    func: Callable,
+    iterable: Iterable,
+    *,
+    workers: Optional[int] = None,
+    kind: str = "thread",
+    chunksize: int = 1,
+    ordered: bool = True,
+    skip_errors: bool = False,
+    **kwargs,
+) -> Iterator:
+    """Map func over the iterable in threads or processes, with a progressbar
+
+    workers - number of the worker threads or processes (default: number of CPUs)
+    kind - "thread" or "process" (the child processes log through this process,
+        see start_process_logging)
+    chunksize - number of items sent to a worker at once
+    ordered - yield the results in the order of the items, or as they are completed
+    skip_errors - log the failed items (with traceback), and leave them out from
+        the results, instead of raising the exception
+    Other keyword arguments are passed to progressbar(), which is updated
+    once per completed chunk.
+
+    It is a generator: the items are read, and the results are yielded lazily,
+    with at most 2 * workers chunks under processing."""
+    global _process_logging
+
+    workers = workers or os.cpu_count() or 1
+    executor: concurrent.futures.Executor
+    if kind == "thread":
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    elif kind == "process":
+        if _process_logging is None:
+            _process_logging = start_process_logging()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            workers,
+            initializer=setup_process_logging,
+            initargs=(_process_logging,),
+        )
+    else:
+        raise ValueError(f"kind must be 'thread' or 'process', not {kind!r}")
+    if "total" not in kwargs and hasattr(iterable, "__len__"):
+        kwargs["total"] = len(iterable)  # type: ignore
+    return _parallel_map(
+        executor, func, iterable, 2 * workers, chunksize, ordered, skip_errors, kwargs
+    )
+
+
+def _parallel_map(
+    executor, func, iterable, max_pending, chunksize, ordered, skip_errors, kwargs
+):
+    iterator = iter(iterable)
+    chunks = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+    pending: deque = deque()  # (future, number of items)
+    bar = progressbar(**kwargs)
+    try:
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                future = executor.submit(_map_chunk, func, chunk, skip_errors)
+                pending.append((future, len(chunk)))
+                if len(pending) < max_pending:
+                    continue
+            # Wait for one or more chunks, or for every chunk at the end
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    concurrent.futures.wait(
+                        [future for future, _ in pending],
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                    done = [item for item in pending if item[0].done()]
+                    for item in done:
+                        pending.remove(item)
+                for future, item_count in done:
+                    yield from future.result()
+                    bar.update(item_count)
+                if chunk is not None:
+                    break
+    finally:
+        bar.close()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _async_exception_handler(loop, context) -> None:
+    """Log the exceptions of tasks, callbacks, etc. like the uncaught exceptions"""
+    logger = logging.getLogger("asyncio")
+    exception = context.get("exception")
+    if exception is None:
+        logger.critical(context["message"])
+    else:
+        message = f"{context['message']}: {type(exception).__name__}: {exception}"
+        logger.critical(message, exc_info=exception)
+
+
+async def _main_with_exception_handler(main: Awaitable):
+    import asyncio
+
+    asyncio.get_running_loop().set_exception_handler(_async_exception_handler)
+    return await main
+
+
+def run(main: Awaitable, *, debug: Optional[bool] = None) -> Any:
+    """Run the main coroutine (see asyncio.run)
+
+    The exceptions of the tasks which are not retrieved, and the other
+    exceptions of the event loop are logged like the uncaught exceptions."""
+    import asyncio
+
+    return asyncio.run(_main_with_exception_handler(main), debug=debug)
+
+
+async def _limited_tasks(aws: Iterable[Awaitable], limit, kwargs):
+    """Yield (index, result) as the awaitables are completed
+
+    At most limit awaitables are running at once, the rest is not even started.
+    On exception (or when the iteration is stopped) the running ones are cancelled."""
+    import asyncio
+
+    if "total" not in kwargs and hasattr(aws, "__len__"):
+        kwargs["total"] = len(aws)  # type: ignore
+    awaitables = enumerate(aws)
+    pending: Dict[Any, int] = {}  # task -> index
+    bar = progressbar(**kwargs)
+    try:
+        while True:
+            for index, aw in awaitables:
+                pending[asyncio.ensure_future(aw)] = index
+                if limit and len(pending) >= limit:
+                    break
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                bar.update()
+                yield index, task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        bar.close()
+
+
+async def as_completed(
+    aws: Iterable[Awaitable], *, limit: Optional[int] = None, **kwargs
+) -> AsyncIterator:
+    """Yield the results of the awaitables as they are completed, with a progressbar
+
+    limit - at most this many awaitables are running at once, so it can be used
+        with thousands of (lazily created) coroutines
+    The keyword arguments are passed to progressbar()."""
+    async for _, result in _limited_tasks(aws, limit, kwargs):
+        yield result
+
+
+async def gather(*aws: Awaitable, limit: Optional[int] = None, **kwargs) -> List:
+    """Return the results of the awaitables in their order, with a progressbar
+
+    See as_completed() for the arguments."""
+    results: List = [None] * len(aws)
+    async for index, result in _limited_tasks(aws, limit, kwargs):
+        results[index] = result
+    return results
+
+
+async def async_progressbar(aiterable: AsyncIterable, **kwargs) -> AsyncIterator:
+    """Iterate over an asynchronous iterable with a progressbar
+
+    The keyword arguments are passed to progressbar()."""
+    with progressbar(**kwargs) as bar:
+        async for item in aiterable:
+            yield item
+            bar.update()
 
 
 def pprint(*args, **kwargs) -> None:
     """PrettyPrint with or without colors"""
+    global _prettyprinter_extras_installed
+    import prettyprinter
+
+    if not _prettyprinter_extras_installed:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            prettyprinter.install_extras()
+        _prettyprinter_extras_installed = True
+
     if _with_colors:
         prettyprinter.cpprint(*args, **kwargs)
     else:
@@ -290,25 +1800,1155 @@ def pprint(*args, **kwargs) -> None:
 pp = pprint
 
 
-class PersistedState(persistedstate.PersistedState):
-    def __init__(self, _filename=None, **kwargs):
-        filename = _filename
-        if filename is None:
-            caller_module = inspect.getmodule(inspect.stack()[1][0])
-            module_file: str = caller_module.__file__  # type:ignore
-            filename = pathlib.Path(module_file).with_suffix(".state").as_posix()
-        return super().__init__(filename, **kwargs)
+_STATE_BACKENDS = {
+    ".json": "json",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+}
+
+
+def _state_backend(filename, backend: Optional[str]) -> str:
+    if backend is None:
+        suffix = pathlib.Path(filename).suffix.lower() if filename is not None else ""
+        backend = _STATE_BACKENDS.get(suffix, "yaml")
+    if backend not in ("yaml", "json", "sqlite"):
+        raise ValueError(f"Unknown PersistedState backend: {backend}")
+    return backend
+
+
+def _state_updates(filepath: pathlib.Path, file_format: str) -> Iterator:
+    """Reads the YAML or JSON state file: a whole state, or the journal
+    of the persistedstate file handler"""
+    if not filepath.exists():
+        return
+    with filepath.open("r", encoding="utf-8") as file:
+        if file_format == "json":
+            import json
+
+            text = file.read()
+            if text.strip():
+                yield json.loads(text)
+        else:
+            import yaml
+
+            yield from yaml.safe_load_all(file)
+
+
+def _apply_state_update(root, update) -> None:
+    if update is None:
+        return
+    if isinstance(update, dict):
+        root.clear()
+        for key, value in update.items():
+            root[key] = value
+        return
+    action, path, key, *value = update
+    obj = root
+    for selector in path:
+        obj = obj[selector]
+    if action == "set":
+        obj[key] = value[0]
+    elif action == "delete":
+        del obj[key]
+    elif action == "insert":
+        obj.insert(key, value[0])
+    else:
+        raise RuntimeError(f"Unknown update step during recovery: {update}")
+
+
+def _read_state(filepath: pathlib.Path, backend: str) -> dict:
+    """Reads the state file into plain dicts and lists"""
+    import json
+
+    data: dict = {}
+    if backend != "sqlite":
+        for update in _state_updates(filepath, backend):
+            _apply_state_update(data, update)
+        return data
+
+    import sqlite3
+
+    connection = sqlite3.connect(filepath)
+    try:
+        for key, value in connection.execute(
+            "SELECT key, value FROM state ORDER BY rowid"
+        ):
+            data[key] = {} if value is None else json.loads(value)
+        for key, item, value in connection.execute(
+            "SELECT key, item, value FROM items ORDER BY rowid"
+        ):
+            data.setdefault(key, {})[json.loads(item)] = json.loads(value)
+    finally:
+        connection.close()
+    return data
+
+
+class _FileLock:
+    """Cross-process lock on a lock file, reentrant in the process
+
+    It uses flock() on POSIX systems, and msvcrt.locking() on Windows."""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            if self.depth == 0:
+                self.file = self.path.open("a+b")
+                self._lock_file(self.file)
+        except BaseException:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.thread_lock.release()
+            raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.depth -= 1
+            if self.depth == 0:
+                self._unlock_file(self.file)
+                self.file.close()
+                self.file = None
+        finally:
+            self.thread_lock.release()
+
+    @staticmethod
+    def _lock_file(file):
+        if os.name == "nt":
+            import msvcrt
+
+            file.seek(0)
+            while True:
+                try:
+                    # It gives up after 10 seconds
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    return
+                except OSError as error:
+                    if error.errno != errno.EDEADLOCK:
+                        raise
+        else:
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+    @staticmethod
+    def _unlock_file(file):
+        if os.name == "nt":
+            import msvcrt
+
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class _StateLock:
+    """Reentrant lock, which flushes the due changes of the state file
+    when the outermost holder releases it (after the change is applied)"""
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.lock = threading.RLock()
+        self.depth = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.depth == 1 and self.state_file.flush_due:
+                self.state_file.flush()
+        finally:
+            self.depth -= 1
+            self.lock.release()
+
+
+class _StateFile:
+    """Persists a PersistedState by writing the whole state atomically
+    in YAML or JSON format
+
+    The changes are coalesced: the state is written when flush_every changes
+    are collected, or flush_interval seconds elapsed since the first one.
+    It replaces the journaling file handler of persistedstate.
+
+    With file_lock, the file is written under a cross-process lock: the recorded
+    changes are applied to the current content of the file, and the merged
+    state is loaded (read-modify-write)."""
+
+    def __init__(
+        self,
+        parent,
+        filepath,
+        *,
+        file_format,
+        flush_interval,
+        flush_every,
+        file_lock=False,
+    ):
+        self.parent = parent
+        self.filepath = pathlib.Path(filepath)
+        self.file_format = file_format
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.lock = _StateLock(self)
+        self.file_lock: Optional[_FileLock] = None
+        if file_lock:
+            self.file_lock = _FileLock(
+                self.filepath.with_name(self.filepath.name + ".lock")
+            )
+        self.updates: List[list] = []  # Recorded changes, with file_lock only
+        self.loading = False
+        self.changes = 0
+        self.flush_due = False
+        self.timer: Optional[threading.Timer] = None
+        _state_files.add(self)
+
+    def load(self):
+        if self.file_lock is not None:
+            with self.lock, self.file_lock:
+                self._reload(_read_state(self.filepath, self.file_format))
+            return
+        self.loading = True
+        try:
+            for update in _state_updates(self.filepath, self.file_format):
+                _apply_state_update(self.parent, update)
+        finally:
+            self.loading = False
+
+    def _reload(self, data):
+        self.loading = True
+        try:
+            _apply_state_update(self.parent, data)
+        finally:
+            self.loading = False
+
+    def record_change(self, *args):
+        if self.loading:
+            return
+        with self.lock:
+            self._mark_changed(*args)
+            self.changes += 1
+            if self.flush_every and self.changes >= self.flush_every:
+                # The change is applied after this call, so flush on releasing the lock
+                self.flush_due = True
+            elif self.timer is None and self.flush_interval is not None:
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _mark_changed(self, action, path, key, *value):
+        if self.file_lock is not None:
+            from persistedstate.types import convert_to_json_like
+
+            self.updates.append(
+                [action, list(path), key, *map(convert_to_json_like, value)]
+            )
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.flush_due = False
+            if not self.changes:
+                return
+            if self.file_lock is None:
+                self._write()
+            else:
+                with self.file_lock:
+                    self._merge()
+            self.changes = 0
+
+    @contextlib.contextmanager
+    def locked(self):
+        if self.file_lock is None:
+            raise RuntimeError("The PersistedState is not created with _lock=True")
+        with self.lock, self.file_lock:
+            self.flush()
+            self._refresh()
+            try:
+                yield
+            finally:
+                self.flush()
+
+    def _refresh(self):
+        self._reload(_read_state(self.filepath, self.file_format))
+
+    def _merge(self):
+        data = _read_state(self.filepath, self.file_format)
+        for update in self.updates:
+            try:
+                _apply_state_update(data, update)
+            except (LookupError, TypeError):
+                logging.getLogger(__name__).warning(
+                    f"Dropping the conflicting change of {self.filepath}: {update}"
+                )
+        self.updates.clear()
+        self._write(data)
+        self._reload(data)
+
+    def _write(self, data=None):
+        from persistedstate.types import convert_to_json_like
+
+        if data is None:
+            data = convert_to_json_like(self.parent)
+        if self.file_format == "json":
+            import json
+
+            text = json.dumps(data, ensure_ascii=False)
+        else:
+            import yaml
+
+            text = yaml.safe_dump(data, allow_unicode=True, sort_keys=True)
+        temp_path = self.filepath.with_name(self.filepath.name + ".tmp")
+        with temp_path.open("w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.filepath)
+
+    def close(self, do_logging=True):
+        self.flush()
+
+
+_MISSING = object()  # A deleted value of the SQLite state file
+_UPSERT_STATE_KEY = (
+    "INSERT INTO state (key, value) VALUES (?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+)
+_UPSERT_STATE_ITEM = (
+    "INSERT INTO items (key, item, value) VALUES (?, ?, ?) "
+    "ON CONFLICT (key, item) DO UPDATE SET value = excluded.value"
+)
+
+
+class _SqliteStateFile(_StateFile):
+    """Persists a PersistedState in an SQLite database
+
+    Every top level key is stored in a separate row, and the items of the
+    dict values, too, so only the changed rows are written on flush.
+    The values are loaded on first access.
+
+    The changes of the concurrent processes are merged by rows. With file_lock,
+    the recorded changes are applied to the current rows of the changed keys
+    (and dict items) under the cross-process lock, and the values are reloaded."""
+
+    def __init__(self, parent, filepath, *, flush_interval, flush_every, file_lock):
+        import sqlite3
+
+        super().__init__(
+            parent,
+            filepath,
+            file_format="sqlite",
+            flush_interval=flush_interval,
+            flush_every=flush_every,
+            file_lock=file_lock,
+        )
+        # The timer thread flushes, too (serialized with self.lock)
+        self.connection = sqlite3.connect(self.filepath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS items "
+                "(key TEXT, item TEXT, value TEXT NOT NULL, PRIMARY KEY (key, item))"
+            )
+        # key -> whether the value is a dict (stored in the items table)
+        self.is_dict: Dict[str, bool] = {}
+        self.values: Dict[str, Any] = {}
+        self.dirty_keys: Set[str] = set()
+        self.dirty_items: Set[Tuple[str, Any]] = set()
+        self._refresh()
+
+    def load(self):
+        pass
+
+    def _refresh(self):
+        self.is_dict = {
+            key: bool(is_dict)
+            for key, is_dict in self.connection.execute(
+                "SELECT key, value IS NULL FROM state ORDER BY rowid"
+            )
+        }
+        self.values.clear()
+
+    def _merge(self):
+        import json
+
+        # The changed rows: the whole top level values, or the items of the
+        # dicts in the file, read back and updated with the recorded changes
+        stored_is_dict = dict(
+            self.connection.execute("SELECT key, value IS NULL FROM state")
+        )
+        keys = set()
+        items = set()
+        for action, path, key, *value in self.updates:
+            if not path:
+                keys.add(key)
+            elif stored_is_dict.get(path[0]):
+                items.add((path[0], path[1] if len(path) > 1 else key))
+            else:
+                keys.add(path[0])
+        items = {(key, item) for key, item in items if key not in keys}
+
+        data: dict = {}
+        for key in keys:
+            if key in stored_is_dict:
+                data[key] = self._read_value(key, bool(stored_is_dict[key]))
+        for key, item in items:
+            obj = data.setdefault(key, {})
+            row = self.connection.execute(
+                "SELECT value FROM items WHERE key = ? AND item = ?",
+                (key, json.dumps(item)),
+            ).fetchone()
+            if row is not None:
+                obj[item] = json.loads(row[0])
+        for update in self.updates:
+            try:
+                _apply_state_update(data, update)
+            except (LookupError, TypeError):
+                logging.getLogger(__name__).warning(
+                    f"Dropping the conflicting change of {self.filepath}: {update}"
+                )
+        self.updates.clear()
+
+        with self.connection:
+            for key in keys:
+                self._write_value(key, data.get(key, _MISSING))
+            for key, item in items:
+                self._write_item(key, item, data[key].get(item, _MISSING))
+        self.dirty_keys.clear()
+        self.dirty_items.clear()
+        self._refresh()
+
+    def _read_value(self, key, is_dict):
+        import json
+
+        if is_dict:
+            rows = self.connection.execute(
+                "SELECT item, value FROM items WHERE key = ? ORDER BY rowid", (key,)
+            )
+            return {json.loads(item): json.loads(value) for item, value in rows}
+        (text,) = self.connection.execute(
+            "SELECT value FROM state WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(text)
+
+    def get(self, key):
+        from persistedstate.types import convert
+
+        with self.lock:
+            if key in self.values:
+                return self.values[key]
+            if key not in self.is_dict:
+                raise KeyError(key)
+            value = self._read_value(key, self.is_dict[key])
+            self.values[key] = convert(self, [key], value)
+            return self.values[key]
+
+    def set(self, key, value):
+        from persistedstate.types import convert
+
+        with self.lock:
+            self.values[key] = convert(self, [key], value)
+            self.is_dict[key] = isinstance(value, Mapping)
+            self.record_change("set", [], key, value)
+
+    def delete(self, key):
+        with self.lock:
+            if key not in self.is_dict:
+                raise KeyError(key)
+            del self.is_dict[key]
+            self.values.pop(key, None)
+            self.record_change("delete", [], key)
+
+    def keys(self):
+        with self.lock:
+            return list(self.is_dict)
+
+    def _mark_changed(self, action, path, key, *value):
+        super()._mark_changed(action, path, key, *value)
+        if not path:
+            self.dirty_keys.add(key)
+        elif self.is_dict.get(path[0]):
+            self.dirty_items.add((path[0], path[1] if len(path) > 1 else key))
+        else:
+            self.dirty_keys.add(path[0])
+
+    def _write(self):
+        from persistedstate.types import convert_to_json_like
+
+        with self.connection:
+            for key in self.dirty_keys:
+                if key in self.is_dict:
+                    self._write_value(key, convert_to_json_like(self.values[key]))
+                else:
+                    self._write_value(key, _MISSING)
+            for key, item in self.dirty_items:
+                if key in self.dirty_keys:
+                    continue
+                obj = self.values[key]
+                if item in obj:
+                    self._write_item(key, item, convert_to_json_like(obj[item]))
+                else:
+                    self._write_item(key, item, _MISSING)
+        self.dirty_keys.clear()
+        self.dirty_items.clear()
+
+    def _write_value(self, key, value):
+        """Writes a JSON-like top level value (the items of the dicts in
+        separate rows), or deletes it if it is _MISSING"""
+        import json
+
+        self.connection.execute("DELETE FROM items WHERE key = ?", (key,))
+        if value is _MISSING:
+            self.connection.execute("DELETE FROM state WHERE key = ?", (key,))
+        elif isinstance(value, dict):
+            self.connection.execute(_UPSERT_STATE_KEY, (key, None))
+            self.connection.executemany(
+                _UPSERT_STATE_ITEM,
+                (
+                    (key, json.dumps(item), json.dumps(item_value))
+                    for item, item_value in value.items()
+                ),
+            )
+        else:
+            self.connection.execute(_UPSERT_STATE_KEY, (key, json.dumps(value)))
+
+    def _write_item(self, key, item, value):
+        """Writes a JSON-like item of a dict value, or deletes it if it is _MISSING"""
+        import json
 
+        if value is _MISSING:
+            self.connection.execute(
+                "DELETE FROM items WHERE key = ? AND item = ?", (key, json.dumps(item))
+            )
+        else:
+            self.connection.execute(
+                _UPSERT_STATE_ITEM, (key, json.dumps(item), json.dumps(value))
+            )
+
+    def close(self, do_logging=True):
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+
+def _state_filename(filename, shard=None) -> str:
+    if filename is None:
+        module_file: str = _caller_filename()  # type: ignore
+        filename = pathlib.Path(module_file).with_suffix(".state").as_posix()
+    if shard is None:
+        return filename
+    path = pathlib.Path(filename)
+    return path.with_name(f"{path.stem}.{shard}{path.suffix}").as_posix()
+
+
+def merged_state(
+    filename=None,
+    *,
+    backend: Optional[str] = None,
+    merge: Optional[Callable[[Any, List], Any]] = None,
+) -> dict:
+    """Read and merge the shards of a PersistedState (see its _shard argument)
+
+    filename - the filename of the PersistedState without shard, the default
+        is the name of the main script with .state suffix
+    backend - the backend of the PersistedState (default: by the file extension)
+    merge - function for merging the values of a top level key: it gets the key
+        and the list of the values (in the order of the shard names)
+
+    The unsharded file (if exists) is merged first, then the shards, in the
+    order of their names. By default, the dicts are merged recursively, the
+    lists are concatenated, and the other values of the later shards win.
+    The result is a snapshot in plain dicts and lists."""
+    backend = _state_backend(filename, backend)
+    path = pathlib.Path(_state_filename(filename))
+    paths = sorted(
+        shard_path
+        for shard_path in path.parent.iterdir()
+        if shard_path.name.startswith(f"{path.stem}.")
+        and shard_path.name.endswith(path.suffix)
+        and len(shard_path.name) > len(path.name) + 1
+        and not shard_path.name.endswith((".lock", ".tmp", "-wal", "-shm"))
+    )
+    if path.exists():
+        paths.insert(0, path)
+
+    values: Dict[Any, List] = {}
+    for shard_path in paths:
+        for key, value in _read_state(shard_path, backend).items():
+            values.setdefault(key, []).append(value)
+    if merge is None:
+        return {
+            key: functools.reduce(_merge_state_values, key_values)
+            for key, key_values in values.items()
+        }
+    return {key: merge(key, key_values) for key, key_values in values.items()}
+
+
+def _merge_state_values(value1, value2):
+    if isinstance(value1, dict) and isinstance(value2, dict):
+        merged = dict(value1)
+        for key, value in value2.items():
+            merged[key] = (
+                _merge_state_values(merged[key], value) if key in merged else value
+            )
+        return merged
+    if isinstance(value1, list) and isinstance(value2, list):
+        return value1 + value2
+    return value2
+
+
+def _flush_persisted_states() -> None:
+    for state_file in list(_state_files):
+        state_file.flush()
+
+
+atexit.register(_flush_persisted_states)
+
+
+class _Resumable:
+    """Iterator of resumable()
+
+    An item is done when the next one is requested, so the item
+    under processing is not checkpointed on break or crash."""
+
+    def __init__(self, iterator, key, state, done, checkpoint_every, seconds, bar):
+        self.iterator = iterator
+        self.key = key
+        self.state = state
+        self.done = done
+        self.checkpointed = done
+        self.checkpoint_every = checkpoint_every
+        self.seconds = seconds
+        self.checkpoint_time = time.monotonic()
+        self.bar = bar
+        self.started = False
+        self.closed = False
+        _resumables.add(self)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.started:
+            self.done += 1
+            if self.bar is not None:
+                self.bar.update()
+            if (
+                self.checkpoint_every
+                and self.done - self.checkpointed >= self.checkpoint_every
+            ) or (
+                self.seconds is not None
+                and time.monotonic() - self.checkpoint_time >= self.seconds
+            ):
+                self.checkpoint()
+        try:
+            item = next(self.iterator)
+        except StopIteration:
+            self.started = False
+            self.close()
+            raise
+        self.started = True
+        return item
+
+    def checkpoint(self) -> None:
+        """Store the number of the done items in the state"""
+        if self.done != self.checkpointed:
+            self.state[self.key] = self.done
+            flush = getattr(self.state, "flush", None)
+            if flush is not None:
+                flush()
+            self.checkpointed = self.done
+        self.checkpoint_time = time.monotonic()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.checkpoint()
+        if self.bar is not None:
+            self.bar.close()
+        _resumables.discard(self)
+
+    def __del__(self):
+        self.close()
+
+
+def resumable(
+    iterable: Iterable,
+    *,
+    key: str,
+    state,
+    checkpoint_every: Optional[int] = None,
+    seconds: Optional[float] = None,
+    **kwargs,
+) -> Iterator:
+    """Iterate with a progressbar, continuing where the previous run stopped
+
+    key - the name of the checkpoint in the state
+    state - PersistedState (or any dict-like object), the number of the done
+        items is stored in it
+    checkpoint_every, seconds - checkpoint after this many done items,
+        or this many seconds (default: every second)
+    Other keyword arguments are passed to progressbar(), which starts at the
+    resumed offset.
+
+    The already done items are skipped lazily, so the iterable must yield the
+    items in the same order in every run (new items can be appended).
+    The done items are checkpointed at the end of the iteration, on break
+    and on crash, too. Delete state[key] to start over."""
+    if checkpoint_every is None and seconds is None:
+        seconds = 1.0
+    done = state.get(key, 0)
+    if "total" not in kwargs and hasattr(iterable, "__len__"):
+        kwargs["total"] = len(iterable)  # type: ignore
+    bar = progressbar(initial=done, **kwargs)
+    if bar.disable:
+        bar = None
+    if done:
+        getLogger().log(VERBOSE, f"Resuming {key} after {done} done items")
+    iterator = itertools.islice(iterable, done, None)
+    return _Resumable(iterator, key, state, done, checkpoint_every, seconds, bar)
+
+
+def _checkpoint_resumables() -> None:
+    for resumable_iterator in list(_resumables):
+        resumable_iterator.checkpoint()
+
+
+# Registered after _flush_persisted_states, so it runs before that
+atexit.register(_checkpoint_resumables)
+
+
+def _create_persisted_state_class():
+    import persistedstate
+    from persistedstate.types import YamlDict
+
+    class PersistedState(persistedstate.PersistedState):
+        """Dict-like state, persisted in a file, with attribute access
+
+        _filename - the default is the name of the main script with .state suffix
+        _backend - "yaml", "json" or "sqlite", the default is chosen by the file
+            extension (.json, .db/.sqlite/.sqlite3, otherwise YAML)
+        _flush_interval, _flush_every - coalesce the changes, write the state
+            at most once in _flush_interval seconds, or after _flush_every changes.
+            By default every change is written immediately.
+        _lock - for concurrent processes: write the changes under a cross-process
+            lock, merged into the current content of the file (see locked())
+        _shard - name of the shard (for example, the worker ID), it is inserted
+            before the extension of the filename (see merged_state())
+        The other keyword arguments are the default values of the state.
+
+        The YAML and JSON backends write the whole state (atomically). The
+        SQLite backend writes only the changed top level keys and the changed
+        items of the dict values, and loads the values on first access."""
+
+        def __new__(cls, _filename=None, *, _backend=None, **kwargs):
+            if (
+                cls is PersistedState
+                and _state_backend(_filename, _backend) == "sqlite"
+            ):
+                cls = _SqlitePersistedState
+            return super().__new__(cls)
+
+        def __init__(
+            self,
+            _filename=None,
+            *,
+            _backend=None,
+            _flush_interval=None,
+            _flush_every=None,
+            _lock=False,
+            _shard=None,
+            **kwargs,
+        ):
+            backend = _state_backend(_filename, _backend)
+            filename = _state_filename(_filename, _shard)
+            if _flush_interval is None and _flush_every is None:
+                if backend == "yaml" and not _lock:
+                    return super().__init__(filename, **kwargs)
+                _flush_every = 1
+
+            file_handler: _StateFile
+            if backend == "sqlite":
+                file_handler = _SqliteStateFile(
+                    self,
+                    filename,
+                    flush_interval=_flush_interval,
+                    flush_every=_flush_every,
+                    file_lock=_lock,
+                )
+            else:
+                file_handler = _StateFile(
+                    self,
+                    filename,
+                    file_format=backend,
+                    flush_interval=_flush_interval,
+                    flush_every=_flush_every,
+                    file_lock=_lock,
+                )
+            self._MappedYaml__file_handler = file_handler
+            self._thread_lock = file_handler.lock
+            if backend != "sqlite":
+                YamlDict.__init__(self, file_handler, [], {})
+                file_handler.load()
+            if _lock:
+                # Another process may set them meanwhile
+                with file_handler.locked():
+                    for key, value in kwargs.items():
+                        self.setdefault(key, value)
+            else:
+                for key, value in kwargs.items():
+                    self.setdefault(key, value)
+
+        def __getattr__(self, name):
+            if name.startswith("_"):
+                # Not initialized (yet)
+                raise AttributeError(
+                    f"{self.__class__} object has no attribute '{name}'"
+                )
+            return super().__getattr__(name)
+
+        def flush(self) -> None:
+            """Write the coalesced changes to the file"""
+            file_handler = self._MappedYaml__file_handler
+            if isinstance(file_handler, _StateFile):
+                file_handler.flush()
+
+        def locked(self):
+            """Context manager for read-modify-write under the cross-process lock
+
+            It reloads the state (with the changes of the other processes),
+            and writes the changes at the end. The previously read nested
+            dicts and lists are not updated by the reload.
+
+                with state.locked():
+                    state.counter += 1
+            """
+            return self._MappedYaml__file_handler.locked()
+
+    class _SqlitePersistedState(PersistedState):
+        def __getitem__(self, key):
+            return self._MappedYaml__file_handler.get(key)
+
+        def __setitem__(self, key, value):
+            self._MappedYaml__file_handler.set(key, value)
+
+        def __delitem__(self, key):
+            self._MappedYaml__file_handler.delete(key)
+
+        def __iter__(self):
+            return iter(self._MappedYaml__file_handler.keys())
+
+        def __len__(self):
+            return len(self._MappedYaml__file_handler.keys())
+
+    PersistedState.__module__ = __name__
+    _SqlitePersistedState.__module__ = __name__
+    return PersistedState
+
+
+def __getattr__(name):
+    """Create the classes with optional backends on first access"""
+    if name == "PersistedState":
+        globals()[name] = _create_persisted_state_class()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_PROFILE_TOP = 20
+_PROFILE_MAX_DEPTH = 64
+_PROFILE_MIN_FRACTION = 0.001
+_profiler = None
+_profile_path = ""
+
+
+def _start_profiling(path: str) -> None:
+    global _profiler
+    global _profile_path
+    import cProfile
+
+    _profile_path = path
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    atexit.register(_stop_profiling)
+
+
+def _stop_profiling() -> None:
+    """Write the profile, and log the top functions"""
+    global _profiler
+    if _profiler is None:
+        return
+    profiler = _profiler
+    _profiler = None
+    profiler.disable()
+    import io
+    import pstats
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    if _profile_path.endswith((".collapsed", ".folded")):
+        _write_collapsed_stacks(_profile_path, _profile_stacks(stats))
+    else:
+        stats.dump_stats(_profile_path)
+    logger = getLogger(__name__)
+    if logger.isEnabledFor(VERBOSE):
+        stats.sort_stats("tottime").print_stats(_PROFILE_TOP)
+        logger.verbose(
+            f"Profile is written to {_profile_path}, the top {_PROFILE_TOP} functions:"
+            f"\n{stream.getvalue().strip()}"
+        )
+
+
+def _profile_label(func) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name
+    return f"{name} ({pathlib.PurePath(filename).name}:{lineno})"
+
+
+def _profile_stacks(stats) -> Dict[Tuple[str, ...], int]:
+    """Estimate the call stacks (with microseconds) from the call graph of cProfile
+
+    The self time of a function is distributed over its callers in proportion
+    to their cumulative times, recursively. The stacks are cut at recursion,
+    at _PROFILE_MAX_DEPTH, and below _PROFILE_MIN_FRACTION."""
+
+    def caller_paths(path, fraction):
+        callers = stats.stats[path[-1]][4] if path[-1] in stats.stats else {}
+        total = sum(caller_stats[3] for caller_stats in callers.values())
+        if total <= 0 or len(path) >= _PROFILE_MAX_DEPTH:
+            yield path, fraction
+            return
+        for caller, caller_stats in callers.items():
+            caller_fraction = fraction * caller_stats[3] / total
+            if caller in path or caller_fraction < _PROFILE_MIN_FRACTION:
+                yield path, caller_fraction
+            else:
+                yield from caller_paths(path + (caller,), caller_fraction)
+
+    stacks: Dict[Tuple[str, ...], int] = {}
+    for func, (_, _, self_time, _, _) in stats.stats.items():
+        for path, fraction in caller_paths((func,), 1.0):
+            microseconds = round(self_time * fraction * 1_000_000)
+            if microseconds:
+                stack = tuple(_profile_label(caller) for caller in reversed(path))
+                stacks[stack] = stacks.get(stack, 0) + microseconds
+    return stacks
+
+
+def _write_collapsed_stacks(path: str, stacks: Dict[Tuple[str, ...], int]) -> None:
+    """Write the stacks in the collapsed format of the flame graph tools"""
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in sorted(stacks.items()):
+            file.write(f"{';'.join(stack)} {count}\n")
 
-def bootstrap_args() -> Tuple[MoreLevelsLogger, argparse.Namespace]:
+
+_TRACE_MEMORY_TOP = 10
+
+
+def _start_memory_tracing() -> None:
+    import tracemalloc
+
+    tracemalloc.start()
+    atexit.register(_stop_memory_tracing)
+
+
+def _stop_memory_tracing() -> None:
+    """Log the peak memory usage, and the top allocation sites"""
+    import tracemalloc
+
+    if not tracemalloc.is_tracing():
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ]
+    )
+    lines = [
+        f"Traced memory: peak {_format_size(peak)}, current {_format_size(current)}"
+    ]
+    rss, peak_rss = _memory_usage()
+    if peak_rss is not None:
+        lines[0] += f", peak RSS {_format_size(peak_rss)}"
+    lines[0] += f", the top {_TRACE_MEMORY_TOP} allocation sites:"
+    for statistic in snapshot.statistics("lineno")[:_TRACE_MEMORY_TOP]:
+        frame = statistic.traceback[0]
+        lines.append(
+            f"  {frame.filename}:{frame.lineno}: {_format_size(statistic.size)}"
+            f" in {statistic.count} blocks"
+        )
+    getLogger(__name__).info("\n".join(lines))
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stacks of all threads periodically, counts the collapsed stacks
+
+    The stacks are written (and the hottest ones are logged) on dump request
+    (SIGUSR1), which is handled in this thread, and at exit."""
+
+    def __init__(self, interval: float, path: str):
+        super().__init__(name="scripthelper-sampler", daemon=True)
+        self.interval = interval
+        self.path = path
+        self.counts: Dict[Tuple[str, ...], int] = {}
+        self.samples = 0
+        self.labels: Dict[Any, str] = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.dump_requested = False
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            self.sample()
+            if self.dump_requested:
+                self.dump_requested = False
+                self.dump(INFO)
+
+    def sample(self):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self.lock:
+            self.samples += 1
+            for thread_id, frame in frames.items():
+                if thread_id == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = self.labels.get(code)
+                    if label is None:
+                        label = self.labels[code] = _profile_label(
+                            (code.co_filename, code.co_firstlineno, code.co_name)
+                        )
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                key = tuple(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+        del frames
+
+    def dump(self, level: int):
+        with self.lock:
+            counts = dict(self.counts)
+            samples = self.samples
+        _write_collapsed_stacks(self.path, counts)
+        logger = getLogger(__name__)
+        if not logger.isEnabledFor(level):
+            return
+        lines = [
+            f"Sampled stacks ({samples} samples) are written to {self.path},"
+            f" the hottest stacks:"
+        ]
+        for stack, count in sorted(counts.items(), key=lambda item: -item[1])[:5]:
+            frames = ";".join(stack[-_SAMPLED_STACK_FRAMES:])
+            if len(stack) > _SAMPLED_STACK_FRAMES:
+                frames = f"{stack[0]};...;{frames}"
+            lines.append(f"{100 * count / max(samples, 1):5.1f}% {frames}")
+        logger.log(level, "\n".join(lines))
+
+
+_SAMPLED_STACK_FRAMES = 6
+_stack_sampler: Optional[_StackSampler] = None
+
+
+def _start_sampling(interval: float, path: str) -> None:
+    global _stack_sampler
+    _stack_sampler = _StackSampler(interval, path)
+    _stack_sampler.start()
+    if (
+        hasattr(signal, "SIGUSR1")
+        and threading.current_thread() is threading.main_thread()
+    ):
+        signal.signal(signal.SIGUSR1, _request_stack_dump)
+    atexit.register(_stop_sampling)
+
+
+def _request_stack_dump(signum, frame) -> None:
+    # The dump is written by the sampler thread, not in the signal handler
+    if _stack_sampler is not None:
+        _stack_sampler.dump_requested = True
+
+
+def _stop_sampling() -> None:
+    """Stop the sampler, write the stacks, and log the hottest ones"""
+    global _stack_sampler
+    if _stack_sampler is None:
+        return
+    sampler = _stack_sampler
+    _stack_sampler = None
+    sampler.stopping.set()
+    sampler.join()
+    sampler.dump(VERBOSE)
+
+
+def bootstrap_args(
+    *,
+    async_logging: bool = False,
+    batched_console: bool = False,
+    traceback_max_value_length: int = 500,
+    traceback_max_frames: int = 100,
+    traceback_time_budget: float = 10.0,
+    traceback_max_repeats: Optional[int] = 3,
+    flight_recorder: int = 0,
+    progressbar_log_interval: Optional[float] = None,
+    log_stats: bool = False,
+) -> Tuple[MoreLevelsLogger, argparse.Namespace]:
     """Bootstraps the framework
 
+    async_logging - format and write the log records in a background thread,
+        so slow terminals or log files do not block the script
+    batched_console - write the console messages in batches (see ConsoleLogHandler),
+        so the progressbars are redrawn less frequently
+    traceback_max_value_length - truncate the variable values in tracebacks
+    traceback_max_frames - display variables only in the innermost frames
+    traceback_time_budget - list the rest of the traceback plain after this many seconds
+        (The command line arguments override these traceback settings.)
+    traceback_max_repeats - render the same traceback (same exception type and code
+        locations) fully only this many times, reference it afterwards (None: always)
+    flight_recorder - keep this many of the last log records below the console level
+        (without formatting them), and write them out on an uncaught exception
+    progressbar_log_interval - the default log_interval of progressbar()
+    log_stats - collect the statistics of logging, see log_stats()
+        (--log-stats collects them, too, and logs them at exit)
+
     returns (logger, args)
         The logger for main scripts
         And the parsed argument"""
     global args
     global _with_colors
     global _with_traceback_variables
+    global _traceback_max_value_length
+    global _traceback_max_frames
+    global _traceback_time_budget
+    global _traceback_max_repeats
+    global _progressbar_log_interval
+    global _log_stats_at_exit
+    global _trace_memory
 
     args = parser.parse_args()
 
@@ -318,27 +2958,63 @@ def bootstrap_args() -> Tuple[MoreLevelsLogger, argparse.Namespace]:
         _with_colors = args.colors
         if args.colors:
             # Hack for pretty printer on force colors
+            from colorful import colorful  # type: ignore
+
             colorful.use_16_ansi_colors()
 
     _with_traceback_variables = not args.disable_traceback_variables
+    _traceback_max_value_length = _first_not_none(
+        args.traceback_max_value_length, traceback_max_value_length
+    )
+    _traceback_max_frames = _first_not_none(
+        args.traceback_max_frames, traceback_max_frames
+    )
+    _traceback_time_budget = _first_not_none(
+        args.traceback_time_budget, traceback_time_budget
+    )
+    _traceback_max_repeats = traceback_max_repeats
+    _progressbar_log_interval = progressbar_log_interval
     console_verbosity = (args.verbose or 0) - (args.quiet or 0)
     console_log_level = _log_level_from_verbosity(console_verbosity)
-    _setup_logger(console_log_level)
+    _setup_logger(
+        console_log_level,
+        async_logging=async_logging,
+        batched_console=batched_console,
+        flight_recorder=flight_recorder,
+        logger_levels=args.log_level or (),
+        log_stats=log_stats or args.log_stats,
+    )
+    _log_stats_at_exit = args.log_stats
+    _trace_memory = args.trace_memory
+    if _trace_memory:
+        _start_memory_tracing()
+    module_path = pathlib.Path(_caller_filename() or "scripthelper")
+    if args.profile is not None:
+        _start_profiling(args.profile or module_path.with_suffix(".prof").as_posix())
+    if args.sampling_profiler is not None:
+        _start_sampling(
+            args.sampling_profiler,
+            module_path.with_suffix(".samples.collapsed").as_posix(),
+        )
 
     logger = getLogger()
     logger.debug(f"Arguments: {args}")
     return logger, args
 
 
-def bootstrap() -> MoreLevelsLogger:
+def bootstrap(**kwargs) -> MoreLevelsLogger:
     """Bootstraps the framework
 
+    For the keyword arguments see bootstrap_args()
+
     returns logger - the logger for the main script"""
-    return bootstrap_args()[0]
+    return bootstrap_args(**kwargs)[0]
 
 
-def initialize() -> argparse.Namespace:
+def initialize(**kwargs) -> argparse.Namespace:
     """Bootstraps the framework
 
+    For the keyword arguments see bootstrap_args()
+
     return args - the parsed arguments"""
-    return bootstrap_args()[1]
+    return bootstrap_args(**kwargs)[1]
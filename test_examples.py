@@ -3,7 +3,12 @@ import subprocess
 import pathlib
 import textwrap
 import os
+import pstats
+import re
+import signal
+import sqlite3
 import sys
+import time
 
 
 class TestExamples(unittest.TestCase):
@@ -61,6 +66,14 @@ class TestExamples(unittest.TestCase):
             Force set non-colored output
             --disable-traceback-variables
             Do not display variables in traceback context
+            --traceback-max-value-length CHARS
+            --traceback-max-frames FRAMES
+            --traceback-time-budget SECONDS
+            --log-level NAME=LEVEL
+            --log-stats
+            --trace-memory
+            --profile [PATH]
+            --sampling-profiler [SECONDS]
             """
         )
         for arg_help in args_help.splitlines():
@@ -117,7 +130,7 @@ class TestExamples(unittest.TestCase):
     def test_example1_with_2_verbose(self):
         expected = textwrap.dedent(
             """
-            DEBUG example1 Arguments: Namespace(verbose=2, quiet=None, colors=None, disable_traceback_variables=False)
+            DEBUG example1 Arguments: Namespace(verbose=2, quiet=None, colors=None, disable_traceback_variables=False, traceback_max_value_length=None, traceback_max_frames=None, traceback_time_budget=None, log_level=None, log_stats=False, trace_memory=False, profile=None, sampling_profiler=None)
             CRITICAL example1 critical message
             ERROR example1 error message
             WARNING example1 warning message
@@ -131,7 +144,7 @@ class TestExamples(unittest.TestCase):
     def test_example1_with_3_verbose(self):
         expected = textwrap.dedent(
             """
-            DEBUG example1 Arguments: Namespace(verbose=3, quiet=None, colors=None, disable_traceback_variables=False)
+            DEBUG example1 Arguments: Namespace(verbose=3, quiet=None, colors=None, disable_traceback_variables=False, traceback_max_value_length=None, traceback_max_frames=None, traceback_time_budget=None, log_level=None, log_stats=False, trace_memory=False, profile=None, sampling_profiler=None)
             CRITICAL example1 critical message
             ERROR example1 error message
             WARNING example1 warning message
@@ -146,7 +159,7 @@ class TestExamples(unittest.TestCase):
     def test_example1_with_3_long_verbose(self):
         expected = textwrap.dedent(
             """
-            DEBUG example1 Arguments: Namespace(verbose=3, quiet=None, colors=None, disable_traceback_variables=False)
+            DEBUG example1 Arguments: Namespace(verbose=3, quiet=None, colors=None, disable_traceback_variables=False, traceback_max_value_length=None, traceback_max_frames=None, traceback_time_budget=None, log_level=None, log_stats=False, trace_memory=False, profile=None, sampling_profiler=None)
             CRITICAL example1 critical message
             ERROR example1 error message
             WARNING example1 warning message
@@ -186,6 +199,40 @@ class TestExamples(unittest.TestCase):
     def test_example4(self):
         self.assert_output("example4.py", "INFO example4module Hello from a module.")
 
+    def test_example4_with_log_level(self):
+        self.assert_output(
+            "example4.py --log-level example4module=verbose",
+            textwrap.dedent(
+                """
+                VERBOSE example4module Calling logger.verbose raises an exception if it does not work.
+                INFO example4module Hello from a module.
+                """
+            ),
+        )
+        self.assert_output("example4.py -v --log-level example4module=WARNING", "")
+
+    def test_example4_with_log_level_and_log_file(self):
+        log_file = pathlib.Path("example4.log")
+        log_file.unlink(missing_ok=True)
+        try:
+            # The DEBUG records of the log file don't reach the console
+            self.assert_output(
+                "example4.py --log-level example4module=debug --log-to-file",
+                textwrap.dedent(
+                    """
+                    VERBOSE example4module Calling logger.verbose raises an exception if it does not work.
+                    INFO example4module Hello from a module.
+                    """
+                ),
+            )
+            self.assertIn(
+                "DEBUG example4 This is displayed only with -vv, or written to the log"
+                " file.",
+                log_file.read_text(),
+            )
+        finally:
+            log_file.unlink(missing_ok=True)
+
     def test_example5(self):
         log_file = pathlib.Path("example5.log")
         if log_file.is_file():
@@ -235,6 +282,12 @@ class TestExamples(unittest.TestCase):
         for variable_line in variable_lines:
             assert variable_line not in output, f"Displayed: {variable_line}"
 
+        output = self.run_command(
+            "example6.py --no-colors --traceback-max-value-length 10",
+            subprocess_check=False,
+        )
+        assert "this_variable = 'will be d..." in output
+
     def test_example7(self):
         self.assert_output(
             "example7.py",
@@ -290,6 +343,576 @@ class TestExamples(unittest.TestCase):
             ),
         )
 
+    def test_example11(self):
+        log_file = pathlib.Path("example11.log")
+        log_file.unlink(missing_ok=True)
+        try:
+            output = self.run_command("example11.py --no-colors", subprocess_check=False)
+            log_content = log_file.read_text()
+        finally:
+            log_file.unlink(missing_ok=True)
+        for content in [output, log_content]:
+            lines = [
+                line[line.index("INFO") :]
+                for line in content.splitlines()
+                if "INFO example11" in line
+            ]
+            self.assertEqual(
+                lines,
+                [
+                    f"INFO example11 Message #{i} is written by a background thread"
+                    for i in range(3)
+                ],
+            )
+            assert "Uncaught RuntimeError: The queued messages" in content
+
+    def test_example12(self):
+        output = self.run_command("example12.py -v")
+        self.assertEqual(
+            output.strip().splitlines(),
+            [
+                "WARNING example12 Iteration 99 flushes the collected messages",
+                "WARNING example12 Iteration 199 flushes the collected messages",
+                "INFO example12 Done",
+            ],
+        )
+        output = self.run_command("example12.py -vv")
+        lines = output.strip().splitlines()[1:]
+        self.assertEqual(len(lines), 253)
+        self.assertEqual(lines[99], "DEBUG example12 Iteration 99")
+        self.assertEqual(
+            lines[100], "WARNING example12 Iteration 99 flushes the collected messages"
+        )
+        self.assertEqual(lines[-2], "DEBUG example12 Iteration 249")
+        self.assertEqual(lines[-1], "INFO example12 Done")
+
+    def test_example13(self):
+        output = self.run_command("example13.py --no-colors", subprocess_check=False)
+        assert "could not be rendered in 0.5 s" in output
+        assert "huge_list" not in output
+        # The innermost frame is rendered first, until the time runs out
+        assert '--> 17           raise RuntimeError("The traceback is rendered' in output
+        assert " = (not rendered, out of time)" in output
+        assert '  File "' in output and "process(3, SlowRepr())" in output
+
+        output = self.run_command(
+            "example13.py --no-colors --traceback-time-budget 10 "
+            "--traceback-max-value-length 20",
+            subprocess_check=False,
+        )
+        assert "could not be rendered" not in output
+        assert "huge_list = [0, 1, 2, 3, 4, 5, 6..." in output
+        assert "slow_object = SlowRepr()" in output
+
+    def test_example14(self):
+        output = self.run_command("example14.py --no-colors")
+        self.assertEqual(output.count("ValueError: Item #0 is invalid"), 1)
+        self.assertEqual(output.count("ValueError: Item #1 is invalid"), 1)
+        for item in range(2, 5):
+            assert (
+                f"(Traceback #{item + 1} of ValueError at example14.py:11,"
+                f" displayed above) ValueError: Item #{item} is invalid"
+            ) in output
+        self.assertEqual(output.count("--> 11"), 2)
+        self.assertTrue(
+            output.strip().endswith(
+                "WARNING scripthelper Traceback of ValueError at example14.py:11"
+                " was repeated 3 more times"
+            )
+        )
+
+    def test_example14_colors_and_log_file(self):
+        log_file = pathlib.Path("example14.log")
+        log_file.unlink(missing_ok=True)
+        try:
+            self.run_command("example14.py --colors --log-to-file")
+            output = log_file.read_text()
+        finally:
+            log_file.unlink(missing_ok=True)
+        # Every traceback is counted once, not once per handler
+        self.assertEqual(output.count("--> 11"), 2)
+        for item in range(2, 5):
+            assert (
+                f"(Traceback #{item + 1} of ValueError at example14.py:11,"
+                f" displayed above) ValueError: Item #{item} is invalid"
+            ) in output
+        self.assertTrue(
+            output.strip().endswith(
+                "WARNING scripthelper Traceback of ValueError at example14.py:11"
+                " was repeated 3 more times"
+            )
+        )
+
+    def test_example15(self):
+        self.assert_output(
+            "example15.py",
+            textwrap.dedent(
+                """
+                INFO example15 Processing item #1
+                WARNING example15 Item 7 has errors
+                WARNING example15 Item 14 has errors
+                INFO example15 Processing item #101 (99 similar messages were suppressed)
+                INFO example15 Processing item #201 (99 similar messages were suppressed)
+                INFO example15 Tick
+                INFO example15module Tick
+                WARNING example15 33 similar messages were suppressed: Item %d has errors
+                INFO example15 49 similar messages were suppressed: Processing item #%d
+                INFO example15 2 similar messages were suppressed: Tick
+                INFO example15module 2 similar messages were suppressed: Tick
+                """
+            ),
+        )
+
+    def test_example16(self):
+        output = self.run_command(
+            "example16.py --no-colors --disable-traceback-variables",
+            subprocess_check=False,
+        )
+        expected = textwrap.dedent(
+            """
+            INFO example16 Item #5 processed
+            INFO scripthelper The last 3 log records before the crash:
+            SPAM example16 Details are recorded, too
+            DEBUG example16 Processing item #5
+            SPAM example16 Details are recorded, too
+            INFO scripthelper End of the last log records
+            CRITICAL None Uncaught RuntimeError: The last log records are displayed before this.
+            """
+        ).strip()
+        assert output.startswith(expected), output
+
+    def test_example17(self):
+        output = self.run_command("example17.py -v --no-colors")
+        lines = output.splitlines()
+        for item in range(1, 5):
+            assert (
+                f"VERBOSE example17 Processing item #{item} in a child process" in lines
+            )
+        assert "ERROR example17 Item #3 failed" in lines
+        assert "     item = 3" in lines
+        assert "ValueError: Item #3 is invalid" in lines
+        assert "INFO example17 Results: [1, 4, 9, 16]" in lines
+
+        output = self.run_command("example17.py --no-colors")
+        assert "VERBOSE" not in output
+        assert "ERROR example17 Item #3 failed" in output
+
+    def test_example17_colors_and_log_file(self):
+        log_file = pathlib.Path("example17.log")
+        log_file.unlink(missing_ok=True)
+        try:
+            output = self.run_command("example17.py --colors --log-to-file")
+            log_content = log_file.read_text()
+        finally:
+            log_file.unlink(missing_ok=True)
+        # The traceback of the child process is colored on the console only
+        assert "\x1b[" in output
+        assert "ValueError: Item #3 is invalid" in log_content
+        assert "\x1b[" not in log_content
+
+    def test_example18(self):
+        output = self.run_command("example18.py --no-colors")
+        lines = output.strip().splitlines()
+        self.assertEqual(lines[0], "ERROR example18 Processing 13 failed")
+        assert "ValueError: Unlucky number" in lines
+        self.assertEqual(lines[-1], "INFO example18 Sum of squares: 328181")
+
+    def test_example19(self):
+        log_file = pathlib.Path("example19.log")
+        log_file.unlink(missing_ok=True)
+        try:
+            output = self.run_command("example19.py")
+            log_content = log_file.read_text()
+        finally:
+            log_file.unlink(missing_ok=True)
+        lines = output.strip().splitlines()
+        self.assertEqual(lines[0], "INFO example19 Processing: 0/20 [00:00<?, ?it/s]")
+        assert lines[-2].startswith("INFO example19 Processing: 20/20 [00:00<00:00, ")
+        self.assertEqual(lines[-1], "INFO example19 Done")
+        self.assertGreater(len(lines), 3)
+        self.assertEqual(
+            [line[20:] for line in log_content.strip().splitlines()], lines
+        )
+
+    def test_example20(self):
+        output = self.run_command("example20.py --no-colors")
+        lines = output.strip().splitlines()
+        self.assertEqual(
+            lines[:3],
+            [
+                "INFO example20 Results: [0, 10, 20, 30, 40, 50, 60, 70, 80, 90]",
+                "INFO example20 Total: 4995000",
+                "CRITICAL asyncio Task exception was never retrieved:"
+                " RuntimeError: This task exception is logged, too.",
+            ],
+        )
+        assert 'raise RuntimeError("This task exception is logged, too.")' in output
+
+    def test_example21(self):
+        state_file = pathlib.Path("example21.state")
+        state_file.unlink(missing_ok=True)
+        try:
+            self.assert_output("example21.py", "INFO example21 Starting from 0")
+            output = self.run_command("example21.py --crash", subprocess_check=False)
+            assert output.startswith("INFO example21 Starting from 10000\n")
+            self.assert_output("example21.py", "INFO example21 Starting from 20000")
+            self.assertEqual(
+                state_file.read_text(),
+                "counter: 30000\nlast_ids:\n- 29998\n- 29999\n- 30000\n",
+            )
+        finally:
+            state_file.unlink(missing_ok=True)
+
+    def test_example21_flush_every(self):
+        expected_contents = {
+            "example21.state": "counter: 5\nlast_ids:\n- 3\n- 4\n- 5\n",
+            "example21.json": '{"counter": 5, "last_ids": [3, 4, 5]}',
+        }
+        for filename, expected_content in expected_contents.items():
+            with self.subTest(filename):
+                state_file = pathlib.Path(filename)
+                state_file.unlink(missing_ok=True)
+                try:
+                    self.assert_output(
+                        f"example21.py --state-file {filename} --iterations 5"
+                        " --flush-every 1 --exit-without-flush",
+                        "INFO example21 Starting from 0",
+                    )
+                    # The last change (removing 2 from last_ids) is written, too
+                    self.assertEqual(state_file.read_text(), expected_content)
+                finally:
+                    state_file.unlink(missing_ok=True)
+
+    def test_example22(self):
+        json_file = pathlib.Path("example22.json")
+        sqlite_file = pathlib.Path("example22.state")
+        json_file.unlink(missing_ok=True)
+        sqlite_file.unlink(missing_ok=True)
+        try:
+            self.assert_output(
+                "example22.py", "INFO example22 Run #1: 10000 new IDs, 10000 IDs seen"
+            )
+            self.assert_output(
+                "example22.py", "INFO example22 Run #2: 5000 new IDs, 15000 IDs seen"
+            )
+            self.assertEqual(json_file.read_text(), '{"count": 2}')
+            connection = sqlite3.connect(sqlite_file)
+            try:
+                self.assertEqual(
+                    connection.execute("SELECT COUNT(*) FROM items").fetchone(),
+                    (15000,),
+                )
+            finally:
+                connection.close()
+        finally:
+            json_file.unlink(missing_ok=True)
+            sqlite_file.unlink(missing_ok=True)
+
+    def test_example23(self):
+        state_file = pathlib.Path("example23.json")
+        state_file.unlink(missing_ok=True)
+        try:
+            output = self.run_command("example23.py --crash-at 5", subprocess_check=False)
+            assert output.startswith(
+                textwrap.dedent(
+                    """\
+                    INFO example23 Processed item #1
+                    INFO example23 Processed item #2
+                    INFO example23 Processed item #3
+                    INFO example23 Processed item #4
+                    CRITICAL None Uncaught RuntimeError: Cannot process item #5
+                    """
+                )
+            )
+            self.assertEqual(state_file.read_text(), '{"items": 4}')
+            self.assert_output(
+                "example23.py -v",
+                textwrap.dedent(
+                    """
+                    VERBOSE example23 Resuming items after 4 done items
+                    INFO example23 Processed item #5
+                    INFO example23 Processed item #6
+                    INFO example23 Processed item #7
+                    INFO example23 Processed item #8
+                    INFO example23 Processed item #9
+                    INFO example23 Processed item #10
+                    """
+                ),
+            )
+            self.assert_output("example23.py", "")
+        finally:
+            state_file.unlink(missing_ok=True)
+
+    def test_example24(self):
+        def remove_state_files():
+            for path in pathlib.Path().glob("example24.*"):
+                if path.name != "example24.py":
+                    path.unlink()
+
+        remove_state_files()
+        try:
+            self.assert_output(
+                "example24.py",
+                "INFO example24 Counter: 100, ids: 100, processed: 100 items",
+            )
+            self.assert_output(
+                "example24.py",
+                "INFO example24 Counter: 200, ids: 200, processed: 200 items",
+            )
+        finally:
+            remove_state_files()
+
+    def test_example24_sqlite(self):
+        def remove_state_files():
+            for path in pathlib.Path().glob("example24.*"):
+                if path.name != "example24.py":
+                    path.unlink()
+
+        remove_state_files()
+        try:
+            self.assert_output(
+                "example24.py --shared-file example24.db",
+                "INFO example24 Counter: 100, ids: 100, processed: 100 items",
+            )
+            self.assert_output(
+                "example24.py --shared-file example24.db",
+                "INFO example24 Counter: 200, ids: 200, processed: 200 items",
+            )
+        finally:
+            remove_state_files()
+
+    def test_example25(self):
+        output = self.run_command("example25.py")
+        lines = output.splitlines()
+        self.assertEqual(lines[0], "INFO example25 Done")
+        duration = r"(\d+\.\d{3} m?s)"
+        process_match = re.fullmatch(
+            rf"INFO example25 Timing of process: count=10, total={duration},"
+            rf" p50={duration}, p95={duration}",
+            lines[1],
+        )
+        summary_match = re.fullmatch(
+            rf"INFO example25 Timing of summary: count=1, total={duration},"
+            rf" p50={duration}, p95={duration}",
+            lines[2],
+        )
+        self.assertIsNotNone(process_match, lines[1])
+        self.assertIsNotNone(summary_match, lines[2])
+        self.assertEqual(len(lines), 3)
+
+        def milliseconds(duration):
+            value, unit = duration.split()
+            return float(value) * (1000 if unit == "s" else 1)
+
+        # Only the lower bounds are checked: sleeping takes longer on a loaded machine
+        total, p50, p95 = map(milliseconds, process_match.groups())
+        self.assertGreaterEqual(total, 85)
+        self.assertGreaterEqual(p50, 9)
+        self.assertGreaterEqual(p95, 18)
+        self.assertGreaterEqual(milliseconds(summary_match.group(1)), 45)
+
+    def test_exception_handler_survives_failing_cleanup(self):
+        output = self.run_command(
+            "example6.py --profile=nonexistent/directory/example6.prof",
+            subprocess_check=False,
+        )
+        self.assertIn(
+            "ERROR scripthelper _stop_profiling() failed before the crash", output
+        )
+        self.assertIn(
+            "CRITICAL None Uncaught RuntimeError: This exception should be handled.",
+            output,
+        )
+
+    def test_example25_profile(self):
+        stats_file = pathlib.Path("example25.prof")
+        stacks_file = pathlib.Path("example25.collapsed")
+        try:
+            output = self.run_command("example25.py -v --profile=example25.prof")
+            self.assertIn(
+                "VERBOSE scripthelper Profile is written to example25.prof,"
+                " the top 20 functions:\n",
+                output,
+            )
+            self.assertIn("{built-in method time.sleep}", output)
+            stats = pstats.Stats(str(stats_file))
+            self.assertIn(("~", 0, "<built-in method time.sleep>"), stats.stats)
+
+            output = self.run_command("example25.py --profile=example25.collapsed")
+            self.assertNotIn("VERBOSE", output)
+            stacks = stacks_file.read_text().splitlines()
+            self.assertTrue(
+                any(
+                    ";process (example25.py:9);<built-in method time.sleep> " in stack
+                    for stack in stacks
+                )
+            )
+        finally:
+            stats_file.unlink(missing_ok=True)
+            stacks_file.unlink(missing_ok=True)
+
+    @unittest.skipUnless(hasattr(signal, "SIGUSR1"), "SIGUSR1 is not available")
+    def test_example26(self):
+        stacks_file = pathlib.Path("example26.samples.collapsed")
+        stacks_file.unlink(missing_ok=True)
+        # Workaround for bug with Nushell, see https://github.com/python/cpython/issues/102496
+        sys_executable = str(pathlib.Path(sys.executable).absolute()).replace(
+            "\\\\?\\", ""
+        )
+        process = subprocess.Popen(
+            [sys_executable, "example26.py", "--sampling-profiler"],
+            stdout=subprocess.PIPE,
+            cwd=pathlib.Path(__file__).absolute().parent,
+        )
+        try:
+            first_line = process.stdout.readline().decode()  # type: ignore
+            self.assertEqual(
+                first_line,
+                "INFO example26 Working, send SIGUSR1 for the sampled stacks\n",
+            )
+            time.sleep(0.5)
+            process.send_signal(signal.SIGUSR1)
+            output = process.communicate(timeout=30)[0].decode()
+            self.assertEqual(process.returncode, 0)
+            assert "INFO scripthelper Sampled stacks (" in output
+            assert "example26.samples.collapsed, the hottest stacks:" in output
+            assert (
+                "% MainThread;<module> (example26.py:1);busy_wait (example26.py:9)"
+                in output
+            )
+            stacks = stacks_file.read_text().splitlines()
+            assert any(
+                stack.startswith(
+                    "MainThread;<module> (example26.py:1);busy_wait (example26.py:9) "
+                )
+                for stack in stacks
+            )
+        finally:
+            process.kill()
+            process.wait()
+            stacks_file.unlink(missing_ok=True)
+
+    def test_example27(self):
+        log_file = pathlib.Path("example27.log")
+        log_file.unlink(missing_ok=True)
+        try:
+            output = self.run_command("example27.py")
+            self.assertEqual(
+                output.strip().splitlines()[-1],
+                "INFO example27 Records of the file handler: 1004",
+            )
+            assert "Log statistics" not in output
+
+            output = self.run_command("example27.py --log-stats")
+        finally:
+            log_file.unlink(missing_ok=True)
+        lines = output.strip().splitlines()
+        self.assertEqual(lines[-4], "INFO scripthelper Log statistics:")
+        self.assertEqual(
+            lines[-3],
+            "  example27: DEBUG 1000, INFO 5, filtered SPAM 1000, filtered DEBUG 1",
+        )
+        self.assertRegex(
+            lines[-2],
+            r"^  file handler: 1005 records, formatting \d+\.\d{3} m?s,"
+            r" I/O \d+\.\d{3} m?s$",
+        )
+        self.assertRegex(lines[-1], r"^  console handler: 5 records, formatting ")
+
+    def test_example28(self):
+        output = self.run_command("example28.py")
+        assert "RSS" not in output
+        assert "Traced memory" not in output
+
+        lines = self.run_command("example28.py --trace-memory").splitlines()
+        if sys.platform.startswith("linux"):
+            # The RSS is not known on every platform
+            self.assertRegex(
+                lines[0],
+                r"^INFO example28 Allocating: 0/100 \[00:00<\?, \?it/s,"
+                r" RSS \d+\.\d MiB, peak \d+\.\d MiB\]$",
+            )
+        self.assertEqual(lines[2], "INFO example28 100 chunks are allocated")
+        self.assertRegex(
+            lines[3],
+            r"^INFO scripthelper Traced memory: peak \d+\.\d MiB,"
+            r" current \d+\.\d MiB(, peak RSS \d+\.\d MiB)?,"
+            r" the top 10 allocation sites:$",
+        )
+        self.assertRegex(lines[4], r"^  example28.py:8: 9\.5 MiB in 10\d blocks$")
+        self.assertEqual(len(lines), 14)
+
+    def test_example29(self):
+        output = self.run_command("example29.py")
+        lines = output.splitlines()
+        self.assertEqual(lines[0], "INFO example29 Summing: 0/1000000 [00:00<?, ?it/s]")
+        assert lines[1].startswith("INFO example29 Summing: 1000000/1000000 [")
+        self.assertEqual(
+            lines[2:],
+            [
+                "INFO example29 Sum: 499999500000",
+                "INFO example29 Count: 1000000,"
+                " final state: Counting: 1000000/1000000, closed: True",
+                "INFO example29 Slow items shown before the end: True",
+            ],
+        )
+
+    def test_import_does_not_load_optional_backends(self):
+        # Workaround for bug with Nushell, see https://github.com/python/cpython/issues/102496
+        sys_executable = str(pathlib.Path(sys.executable).absolute()).replace(
+            "\\\\?\\", ""
+        )
+        result = subprocess.run(
+            [sys_executable, "-X", "importtime", "-c", "import scripthelper"],
+            stderr=subprocess.PIPE,
+            check=True,
+            cwd=pathlib.Path(__file__).absolute().parent,
+        )
+        imported = {
+            line.split("|")[-1].strip()
+            for line in result.stderr.decode().splitlines()
+        }
+        self.assertIn("scripthelper", imported)
+        for module in [
+            "coloredlogs",
+            "persistedstate",
+            "prettyprinter",
+            "stackprinter",
+            "tqdm",
+            "colorful",
+        ]:
+            self.assertNotIn(module, imported)
+
+    def test_get_logger_is_registered_in_logging(self):
+        # Workaround for bug with Nushell, see https://github.com/python/cpython/issues/102496
+        sys_executable = str(pathlib.Path(sys.executable).absolute()).replace(
+            "\\\\?\\", ""
+        )
+        code = textwrap.dedent(
+            """
+            import logging
+            library_logger = logging.getLogger("library")
+            import scripthelper
+            logger = scripthelper.getLogger("example")
+            print(isinstance(logger, scripthelper.MoreLevelsLogger))
+            print(type(scripthelper.getLogger("library")) is logging.Logger)
+            print(logger is scripthelper.getLogger("example"))
+            print(logger is logging.getLogger("example"))
+            print(logger.isEnabledFor(logging.DEBUG))
+            logging.getLogger().setLevel(logging.DEBUG)
+            print(logger.isEnabledFor(logging.DEBUG))
+            """
+        )
+        result = subprocess.run(
+            [sys_executable, "-c", code],
+            stdout=subprocess.PIPE,
+            check=True,
+            cwd=pathlib.Path(__file__).absolute().parent,
+        )
+        self.assertEqual(
+            result.stdout.decode().split(), ["True"] * 4 + ["False", "True"]
+        )
+
     def test_example10(self):
         self.assert_output("example10.py", "WARNING example10 Item #12 has some errors")
 